@@ -26,17 +26,21 @@ router = APIRouter(prefix="/display")
 def get_all_data(
     start: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
+    after_id: int | None = Query(None, ge=0),
     db: Session = Depends(get_db),
     _current_user=Depends(get_current_user),
 ):
-    """Return paginated shift data."""
-    selected_month, total_records, data, message = fetch_shift_data(db, start, limit)
+    """Return paginated shift data (offset via start, or keyset via after_id)."""
+    selected_month, total_records, data, message, next_cursor = fetch_shift_data(
+        db, start, limit, after_id=after_id
+    )
 
     return {
         "selected_month": selected_month,
         "message": message,
         "total_records": total_records,
         "data": data,
+        "next_cursor": next_cursor,
     }
 
 
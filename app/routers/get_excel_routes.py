@@ -1,16 +1,16 @@
-from fastapi import APIRouter, Depends, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Body, Request
 from sqlalchemy.orm import Session
 
 from db import get_db
 from utils.dependencies import get_current_user
-from services.get_excel_service import shift_excel_download_service
+from services.get_excel_service import build_excel_file_response, shift_excel_download_service
 
 router = APIRouter(prefix="/excel", tags=["Excel Data"])
 
 
 @router.post("/download")
 def download_excel(
+    request: Request,
     payload: dict = Body(
         ...,
         example={
@@ -33,13 +33,9 @@ def download_excel(
     db: Session = Depends(get_db),
     _current_user=Depends(get_current_user),
 ):
-    file_path = shift_excel_download_service(
+    file_path, stat_result = shift_excel_download_service(
         db=db,
         payload=payload
     )
 
-    return FileResponse(
-        path=file_path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="shift_data.xlsx",
-    )
\ No newline at end of file
+    return build_excel_file_response(request, file_path, stat_result=stat_result)
\ No newline at end of file
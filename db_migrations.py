@@ -0,0 +1,86 @@
+"""
+Idempotent schema upgrades.
+
+Base.metadata.create_all() only creates missing tables; it never adds
+columns, indexes or constraints to a table that already exists. Every
+schema change made to an existing model is therefore also listed here as
+re-runnable DDL, applied at startup right after create_all and before the
+app serves traffic. On a freshly created database each statement is a no-op.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+def _canonical_shift_type(table: str, constraint: str) -> str:
+    """Backfill upper(btrim(shift_type)) and add the CHECK, once (skipped when the CHECK exists)."""
+    return f"""
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = '{constraint}' AND conrelid = '{table}'::regclass
+    ) THEN
+        UPDATE {table} SET shift_type = upper(btrim(shift_type))
+        WHERE shift_type <> upper(btrim(shift_type));
+        ALTER TABLE {table} ADD CONSTRAINT {constraint}
+            CHECK (shift_type = upper(btrim(shift_type)));
+    END IF;
+END $$
+"""
+
+
+SCHEMA_UPGRADES = [
+    # shift_allowances: indexed lower(btrim(...)) copies for case/space-insensitive filters
+    "ALTER TABLE shift_allowances ADD COLUMN IF NOT EXISTS emp_id_norm varchar(50) "
+    "GENERATED ALWAYS AS (lower(btrim(emp_id))) STORED",
+    "ALTER TABLE shift_allowances ADD COLUMN IF NOT EXISTS department_norm varchar(100) "
+    "GENERATED ALWAYS AS (lower(btrim(department))) STORED",
+    "ALTER TABLE shift_allowances ADD COLUMN IF NOT EXISTS client_norm varchar(100) "
+    "GENERATED ALWAYS AS (lower(btrim(client))) STORED",
+    "ALTER TABLE shift_allowances ADD COLUMN IF NOT EXISTS client_partner_norm varchar(100) "
+    "GENERATED ALWAYS AS (lower(btrim(client_partner))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_shift_allowances_emp_id_norm ON shift_allowances (emp_id_norm)",
+    "CREATE INDEX IF NOT EXISTS ix_shift_allowances_department_norm ON shift_allowances (department_norm)",
+    "CREATE INDEX IF NOT EXISTS ix_shift_allowances_client_norm ON shift_allowances (client_norm)",
+    "CREATE INDEX IF NOT EXISTS ix_shift_allowances_client_partner_norm "
+    "ON shift_allowances (client_partner_norm)",
+    # shift_allowances: year*100 + month of duration_month for period filters; the
+    # (duration_ym, emp_id) index serves both the IN filter and the search sort
+    "ALTER TABLE shift_allowances ADD COLUMN IF NOT EXISTS duration_ym integer "
+    "GENERATED ALWAYS AS ((EXTRACT(YEAR FROM duration_month) * 100 "
+    "+ EXTRACT(MONTH FROM duration_month))::int) STORED",
+    "CREATE INDEX IF NOT EXISTS shift_allowances_ym_emp_idx ON shift_allowances (duration_ym, emp_id)",
+    # shift_allowances: month/client-partner filter of the Excel export
+    "CREATE INDEX IF NOT EXISTS shift_allowances_month_cp_idx "
+    "ON shift_allowances (duration_month DESC, client_partner_norm) INCLUDE (id)",
+    # shift_allowances: trigram GIN indexes for the search filters' ILIKE '%term%'
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS shift_allowances_client_trgm "
+    "ON shift_allowances USING gin (client gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS shift_allowances_department_trgm "
+    "ON shift_allowances USING gin (department gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS shift_allowances_emp_id_trgm "
+    "ON shift_allowances USING gin (emp_id gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS shift_allowances_client_partner_trgm "
+    "ON shift_allowances USING gin (client_partner gin_trgm_ops)",
+    # shift_mapping: search shift filter and the per-allowance (shift_type, days) prefetch
+    "CREATE INDEX IF NOT EXISTS shift_mapping_alloc_shift_key_idx "
+    "ON shift_mapping (shiftallowance_id, upper(trim(shift_type)))",
+    "CREATE INDEX IF NOT EXISTS shift_mapping_alloc_id_idx "
+    "ON shift_mapping (shiftallowance_id) INCLUDE (shift_type, days)",
+    # shift_mapping: per-row change stamp (max() invalidates the department analytics cache)
+    "ALTER TABLE shift_mapping ADD COLUMN IF NOT EXISTS updated_at timestamp DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_shift_mapping_updated_at ON shift_mapping (updated_at)",
+    # shift_type is compared as stored on read paths: backfill the canonical
+    # upper(btrim()) form once, then enforce it for every writer (ORM or Core)
+    _canonical_shift_type("shift_mapping", "chk_shift_mapping_shift_type_canonical"),
+    _canonical_shift_type("shifts_amount", "chk_shifts_amount_shift_type_canonical"),
+]
+
+
+def apply_schema_upgrades(engine: Engine) -> None:
+    """Run every SCHEMA_UPGRADES statement, in order, in one transaction."""
+    with engine.begin() as conn:
+        for stmt in SCHEMA_UPGRADES:
+            conn.execute(text(stmt))
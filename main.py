@@ -2,17 +2,19 @@
 FastAPI application entry point.
 
 This module initializes the FastAPI app, configures CORS middleware,
-creates database tables, and registers all API routes.
+creates database tables, applies schema upgrades, and registers all API routes.
 """
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 from db import Base,engine
+from db_migrations import apply_schema_upgrades
 from app import route
 
 
 app = FastAPI()
 Base.metadata.create_all(bind=engine)
+apply_schema_upgrades(engine)
 origins = [
     "http://localhost:5173",  
     "http://127.0.0.1:5173",
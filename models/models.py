@@ -8,10 +8,13 @@ shift allowances, shift mappings, and shift amount configurations.
 # pylint: disable=too-few-public-methods,not-callable
 from sqlalchemy import (
     Column, Integer, String, Text, TIMESTAMP, Numeric, func,
-    ForeignKey,UniqueConstraint,Date,CheckConstraint,Float
+    ForeignKey,UniqueConstraint,Date,CheckConstraint,Float,Computed,Index,DDL,event
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from db import Base
+
+# Trigram GIN indexes below need pg_trgm before create_all builds them
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
  
  
 # USERS TABLE
@@ -72,12 +75,42 @@ class ShiftAllowances(Base):
     rmg_comments = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # Indexed lower(btrim(...)) copies for case/space-insensitive filters
+    emp_id_norm = Column(String(50), Computed("lower(btrim(emp_id))", persisted=True), index=True)
+    department_norm = Column(String(100), Computed("lower(btrim(department))", persisted=True), index=True)
+    client_norm = Column(String(100), Computed("lower(btrim(client))", persisted=True), index=True)
+    client_partner_norm = Column(String(100), Computed("lower(btrim(client_partner))", persisted=True),
+                                 index=True)
+    # year*100 + month of duration_month (e.g. 202501), for sargable period filters
+    duration_ym = Column(
+        Integer,
+        Computed("(EXTRACT(YEAR FROM duration_month) * 100 + EXTRACT(MONTH FROM duration_month))::int",
+                 persisted=True),
+    )
  
-    shift_mappings = relationship("ShiftMapping", back_populates="shift_allowance")
+    # shift_mapping.shiftallowance_id is ON DELETE CASCADE; let the database remove children
+    shift_mappings = relationship("ShiftMapping", back_populates="shift_allowance",
+                                  cascade="all, delete", passive_deletes=True)
  
     __table_args__ = (
         UniqueConstraint('duration_month', 'payroll_month', 'emp_id','client',
                          name='uix_payroll_employee'),
+        # duration_month is always stored as the 1st of the month, so month
+        # filters compare it directly and can use this index
+        Index('shift_allowances_month_cp_idx', duration_month.desc(), client_partner_norm,
+              postgresql_include=['id']),
+        # search: period IN on duration_ym ordered by (duration_ym, emp_id)
+        Index('shift_allowances_ym_emp_idx', duration_ym, emp_id),
+        # serve the search filters' ILIKE '%term%' substring matches
+        Index('shift_allowances_client_trgm', client,
+              postgresql_using='gin', postgresql_ops={'client': 'gin_trgm_ops'}),
+        Index('shift_allowances_department_trgm', department,
+              postgresql_using='gin', postgresql_ops={'department': 'gin_trgm_ops'}),
+        Index('shift_allowances_emp_id_trgm', emp_id,
+              postgresql_using='gin', postgresql_ops={'emp_id': 'gin_trgm_ops'}),
+        Index('shift_allowances_client_partner_trgm', client_partner,
+              postgresql_using='gin', postgresql_ops={'client_partner': 'gin_trgm_ops'}),
     )
  
  
@@ -92,6 +125,17 @@ class ShiftsAmount(Base):
  
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # Read paths compare shift_type as stored; the CHECK also covers Core/bulk inserts
+    __table_args__ = (
+        CheckConstraint('shift_type = upper(btrim(shift_type))',
+                        name='chk_shifts_amount_shift_type_canonical'),
+    )
+
+    @validates("shift_type")
+    def _normalize_shift_type(self, _key, value):
+        """Store shift_type in canonical form (trimmed, upper-case)."""
+        return value.strip().upper() if isinstance(value, str) else value
  
  
 # SHIFT MAPPING TABLE
@@ -102,16 +146,32 @@ class ShiftMapping(Base):
     id = Column(Integer, primary_key=True, index=True)
     shiftallowance_id = Column(Integer, ForeignKey("shift_allowances.id", ondelete="CASCADE"))
     shift_type = Column(String(50), nullable=False)
-    # Two-decimal numeric
-    days = Column(Numeric(10, 2), nullable=False, default=0)
+    # Two-decimal numeric, returned as float to avoid Decimal churn in hot loops
+    days = Column(Numeric(10, 2, asdecimal=False), nullable=False, default=0)
     total_allowance = Column(Float, default=0)
+    # bumped on every ORM/Core UPDATE; dashboard caches use max() as a change stamp
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), index=True)
  
  
     # Optional: ensure days is non-negative
     __table_args__ = (
         CheckConstraint('days >= 0', name='chk_days_non_negative'),
+        # read paths compare shift_type as stored; the CHECK also covers Core/bulk inserts
+        CheckConstraint('shift_type = upper(btrim(shift_type))',
+                        name='chk_shift_mapping_shift_type_canonical'),
+        # serves the search shift filter and the per-allowance prefetch
+        Index('shift_mapping_alloc_shift_key_idx', shiftallowance_id,
+              func.upper(func.trim(shift_type))),
+        # index-only scans for the per-allowance (shift_type, days) prefetch
+        Index('shift_mapping_alloc_id_idx', shiftallowance_id,
+              postgresql_include=['shift_type', 'days']),
     )
  
     shift_allowance = relationship("ShiftAllowances", back_populates="shift_mappings")
+
+    @validates("shift_type")
+    def _normalize_shift_type(self, _key, value):
+        """Store shift_type in canonical form (trimmed, upper-case)."""
+        return value.strip().upper() if isinstance(value, str) else value
  
  
\ No newline at end of file
@@ -558,7 +558,7 @@ def get_client_total_allowances(db: Session, filters):
     rows = q.all()
 
     # Load shift rates
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {
         str(r.shift_type).upper(): Decimal(r.amount or 0)
         for r in rate_rows
@@ -1114,7 +1114,7 @@ def get_client_dashboard(db: Session, filters) -> Dict[str, Any]:
     allowance_ranges = _parse_allowance_ranges(getattr(filters, "allowance", None))
 
     # Rates
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {str(r.shift_type).upper(): Decimal(r.amount or 0) for r in rate_rows}
 
     # Base query
@@ -1627,7 +1627,7 @@ def get_department_dashboard(db: Session, filters: DeptDashboardFilter) -> Dict[
     allowance_ranges = _parse_allowance_ranges(getattr(filters, "allowance", None))
 
  
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {str(r.shift_type).upper(): Decimal(r.amount) for r in rate_rows}
 
     q = db.query(ShiftAllowances)
@@ -1924,7 +1924,7 @@ def get_department_total_allowances(db: Session, filters: DepartmentTotalAllowan
     rows = q.all()
 
     # Load shift rates
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {
         str(r.shift_type).upper(): Decimal(r.amount or 0)
         for r in rate_rows
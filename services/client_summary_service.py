@@ -436,17 +436,10 @@ def client_summary_service(db: Session, payload: dict):
     if filter_clauses:
         query = query.filter(and_(*filter_clauses))
 
-    month_numbers = [(d.year, d.month) for d in months_to_use]
-
-    month_filters = [
-        and_(
-            extract("year", ShiftAllowances.duration_month) == y,
-            extract("month", ShiftAllowances.duration_month) == m,
-        )
-        for y, m in month_numbers
-    ]
-
-    query = query.filter(or_(*month_filters))
+    # One IN on the indexed duration_ym column instead of an OR of (year, month) pairs
+    query = query.filter(
+        ShiftAllowances.duration_ym.in_([d.year * 100 + d.month for d in months_to_use])
+    )
 
     rows = query.all()
 
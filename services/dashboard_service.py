@@ -15,6 +15,8 @@ from utils.shift_config import get_all_shift_keys
 from collections import defaultdict,OrderedDict
 from utils.shift_config import SHIFT_TYPES,get_shift_string
 from decimal import Decimal, InvalidOperation
+import json
+import threading
 
 def parse_allowance_ranges(allowance) -> Optional[List[Tuple[float, float]]]:
     """
@@ -350,7 +352,7 @@ def get_piechart_shift_summary(
             raise HTTPException(400, "end_month cannot be less than start_month")
         months = generate_months(start_month, end_month)
 
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {r.shift_type.upper(): float(r.amount) for r in rate_rows}
 
     combined = {}
@@ -507,7 +509,7 @@ def get_vertical_bar_service(
 
         months = generate_months_list(start_month, end_month)
 
-    rate_rows = db.query(ShiftsAmount).all()
+    rate_rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
     rates = {r.shift_type.upper(): float(r.amount) for r in rate_rows}
 
     summary = {}
@@ -2953,7 +2955,88 @@ def _effective_order(for_field_kind: str, requested: str) -> str:
     return "desc" if for_field_kind == "num" else "asc"
 
 
+DEPT_ANALYTICS_CACHE_SIZE = 256
+_dept_analytics_cache: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+_dept_analytics_cache_lock = threading.Lock()
+
+
+def _freeze_payload_value(value: Any) -> Any:
+    """Convert lists/dicts into hashable tuples/frozensets (recursively)."""
+    if isinstance(value, dict):
+        return frozenset((k, _freeze_payload_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze_payload_value(v) for v in value)
+    return value
+
+
+def _department_data_version(db: Session) -> Tuple[Any, ...]:
+    """
+    Cheap invalidation stamp for department analytics results.
+    Changes whenever allowances or shift mappings are inserted, updated or
+    deleted, or shift rates change (the totals are days * rate per mapping).
+    """
+    return tuple(
+        db.query(
+            db.query(func.max(ShiftAllowances.updated_at)).scalar_subquery(),
+            db.query(func.max(ShiftAllowances.id)).scalar_subquery(),
+            db.query(func.max(ShiftMapping.updated_at)).scalar_subquery(),
+            db.query(func.max(ShiftMapping.id)).scalar_subquery(),
+            db.query(func.count(ShiftMapping.id)).scalar_subquery(),
+            db.query(func.max(ShiftsAmount.updated_at)).scalar_subquery(),
+        ).one()
+    )
+
+
+def _is_cacheable_period(pairs: List[Tuple[int, int]]) -> bool:
+    """Only fully elapsed months are cached; the current month is still being loaded."""
+    if not pairs:
+        return False
+    today = date.today()
+    return all((y, m) < (today.year, today.month) for y, m in pairs)
+
+
 def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsRequest') -> Dict[str, Any]:
+    """
+    Department analytics with an in-process LRU response cache.
+
+    Results are cached per (normalized payload, resolved periods, data version)
+    and only when every requested period is a past month.
+    """
+    payload_dict = _payload_to_plain_dict(payload)
+    pairs, period_message = validate_years_months(payload_dict, db=db)
+
+    if not _is_cacheable_period(pairs):
+        return _compute_department_analytics(db, payload_dict, pairs, period_message)
+
+    cache_key = (
+        _freeze_payload_value(payload_dict),
+        tuple(pairs),
+        period_message,
+        _department_data_version(db),
+    )
+    with _dept_analytics_cache_lock:
+        cached = _dept_analytics_cache.get(cache_key)
+        if cached is not None:
+            _dept_analytics_cache.move_to_end(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    result = _compute_department_analytics(db, payload_dict, pairs, period_message)
+
+    with _dept_analytics_cache_lock:
+        _dept_analytics_cache[cache_key] = json.dumps(result)
+        _dept_analytics_cache.move_to_end(cache_key)
+        while len(_dept_analytics_cache) > DEPT_ANALYTICS_CACHE_SIZE:
+            _dept_analytics_cache.popitem(last=False)
+    return result
+
+
+def _compute_department_analytics(
+    db: Session,
+    payload_dict: dict,
+    pairs: List[Tuple[int, int]],
+    period_message: Optional[str],
+) -> Dict[str, Any]:
     """
     Department analytics:
       - Aggregate by department
@@ -2969,8 +3052,6 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
         Allowed: client | client_partner_count | headcount | total_allowance | shift:<KEY> | <KEY>
         Defaults to total_allowance (numeric desc).
     """
-    payload_dict = _payload_to_plain_dict(payload)
-
     clients_filter = parse_clients(payload_dict.get("clients", "ALL"))
     depts_filter = parse_departments(payload_dict.get("departments", "ALL"))
     shifts_filter = parse_shifts(payload_dict.get("shifts", "ALL"))
@@ -2988,7 +3069,6 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
     allowance_ranges = parse_allowance_ranges(payload_dict.get("allowance"))
 
     # Periods
-    pairs, period_message = validate_years_months(payload_dict, db=db)
     periods = [f"{y:04d}-{m:02d}" for y, m in pairs]
 
     # Shift details (from config)
@@ -3119,48 +3199,24 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
                 cname,
                 {
                     "partners_set": set(),
-                    "emp_set": set(),
                     "total_allowance": 0.0,
                     "shift_totals": {k: 0.0 for k in SHIFT_KEYS},
-                    "employees": {},  # eid -> employee totals (client level)
                 },
             )
             cnode["partners_set"].add(cpname)
-            if eid:
-                cnode["emp_set"].add(eid)
             cnode["total_allowance"] += allowance
             if st in cnode["shift_totals"]:
                 cnode["shift_totals"][st] += allowance
 
-            # Client-level employees (may be omitted in response if partners exist)
-            if eid:
-                pe = cnode["employees"].get(eid)
-                if not pe:
-                    pe = {
-                        "emp_id": eid,
-                        "emp_name": clean_str(emp_name),
-                        "client": cname,
-                        "client_partner": cpname,
-                        **{k: 0.0 for k in SHIFT_KEYS},
-                        "total_allowance": 0.0,
-                    }
-                    cnode["employees"][eid] = pe
-                if st in pe:
-                    pe[st] += allowance
-                pe["total_allowance"] += allowance
-
             # Partner-level node
             pnode = partners_map.setdefault(
                 (cname, cpname),
                 {
-                    "emp_set": set(),
                     "total_allowance": 0.0,
                     "shift_totals": {k: 0.0 for k in SHIFT_KEYS},
                     "employees": {},  # eid -> employee totals (partner level)
                 },
             )
-            if eid:
-                pnode["emp_set"].add(eid)
             pnode["total_allowance"] += allowance
             if st in pnode["shift_totals"]:
                 pnode["shift_totals"][st] += allowance
@@ -3253,16 +3309,24 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
             dept_obj["shifts_summary"] = {k: round(v, 2) for k, v in shifts_summary.items()}
 
           
+            # Partner nodes grouped per client (client-level employees are derived from these)
+            partners_by_client: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
+            for (client_key, partner_name), pnode in partners_map.items():
+                partners_by_client[client_key].append((partner_name, pnode))
+
             # Build sortable list from clients_map for this department
             client_items: List[Tuple[str, Dict[str, Any], Dict[str, Any]]] = []
             for cname, cnode in clients_map.items():
+                client_emp_ids: Set[str] = set()
+                for _pname, pnode in partners_by_client.get(cname, []):
+                    client_emp_ids.update(pnode["employees"])
                 client_items.append((
                     cname,
                     cnode,
                     {
                         "client": cname,
                         "client_partner_count": len(cnode["partners_set"]),
-                        "headcount": len(cnode["emp_set"]),
+                        "headcount": len(client_emp_ids),
                         "total_allowance": round(float(cnode["total_allowance"]), 2),
                         "_shifts_summary": cnode.get("shift_totals", {}),
                     }
@@ -3306,10 +3370,7 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
             for cname, cnode, cmetrics in client_items:
                 # Build partner collections
                 partners_out: Dict[str, Any] = {}
-                for (client_key, partner_name), pnode in partners_map.items():
-                    if client_key != cname:
-                        continue
-
+                for partner_name, pnode in partners_by_client.get(cname, []):
                     partner_employees = list(pnode["employees"].values())
                     if employee_cap:
                         partner_employees = sorted(
@@ -3317,7 +3378,7 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
                         )[:employee_cap]
 
                     partners_out[partner_name] = {
-                        "headcount": len(pnode["emp_set"]),
+                        "headcount": len(pnode["employees"]),
                         "total_allowance": round(pnode["total_allowance"], 2),
                         "shifts_summary": {k: round(v, 2) for k, v in pnode["shift_totals"].items()},
                         "employees": sorted(
@@ -3336,8 +3397,19 @@ def department_analytics_service(db: Session, payload: 'DepartmentAnalyticsReque
                 }
 
                 if not has_partners:
-                    # Only when there are NO partners, include client-level employees
-                    employees_list = list(cnode["employees"].values())
+                    # Only when there are NO partners, build client-level employees
+                    # lazily by folding the partner-level rows for this client.
+                    client_employees: Dict[str, Dict[str, Any]] = {}
+                    for _pname, pnode in partners_by_client.get(cname, []):
+                        for eid, pe in pnode["employees"].items():
+                            ce = client_employees.get(eid)
+                            if not ce:
+                                client_employees[eid] = dict(pe)
+                                continue
+                            for k in SHIFT_KEYS:
+                                ce[k] += pe.get(k, 0.0)
+                            ce["total_allowance"] += pe["total_allowance"]
+                    employees_list = list(client_employees.values())
                     if employee_cap:
                         employees_list = sorted(
                             employees_list, key=lambda x: x["total_allowance"], reverse=True
@@ -2,62 +2,76 @@ from __future__ import annotations
 
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import extract, func
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from sqlalchemy import bindparam, extract, func, select, update
 
 from models.models import ShiftAllowances, ShiftMapping, ShiftsAmount
+from services.shift_rates import load_shift_rates, shift_rates_version
 from utils.client_enums import Company
 from utils.shift_config import get_all_shift_keys, get_shift_string
 
 from datetime import datetime, date
-from typing import Optional, Dict, Union, Any,List
+from typing import Optional, Dict, Union, Any,List,Tuple
 from io import BytesIO
 from calendar import monthrange
-from diskcache import Cache
+from functools import lru_cache
+from dateutil.relativedelta import relativedelta
 
-import pandas as pd
+import numpy as np
+import xlsxwriter
 
 
-cache = Cache("./diskcache/latest_month")
-LATEST_MONTH_KEY = "client_summary:latest_month"
+# ShiftsAmount version for which stored mapping totals were last recomputed
+_recalculated_rates_version: Optional[tuple] = None
 
 
-def is_latest_month(db: Session, duration_dt: date) -> bool:
-    latest_month = db.query(func.max(ShiftAllowances.duration_month)).scalar()
-    if not latest_month:
-        return False
-    return latest_month.year == duration_dt.year and latest_month.month == duration_dt.month
+def _recalculate_mappings_if_rates_changed(db: Session, version: Optional[tuple] = None) -> None:
+    """Recompute stored mapping totals only when shift rates changed since the last run."""
+    global _recalculated_rates_version
+    if version is None:
+        version = shift_rates_version(db)
+    if version == _recalculated_rates_version:
+        return
+    _recalculate_all_mappings(db)
+    _recalculated_rates_version = version
 
 
-def _load_shift_rates(db: Session) -> Dict[str, float]:
+def _mapping_rate_sq():
     """
-    Load shift rates from ShiftsAmount table.
-    Returns dict like {'PST_MST': 700.0, 'ANZ': 900.0, ...}
+    Correlated scalar subquery: rate for the enclosing ShiftMapping row's shift_type.
+    Mirrors load_shift_rates (one rate per shift type, latest row wins).
     """
-    rows = db.query(ShiftsAmount).all()
-    rates: Dict[str, float] = {}
-    for r in rows:
-        if not r.shift_type:
-            continue
-        rates[(r.shift_type or "").upper().strip()] = float(r.amount or 0.0)
-    return rates
+    return (
+        select(ShiftsAmount.amount)
+        .where(ShiftsAmount.shift_type == ShiftMapping.shift_type)
+        .order_by(ShiftsAmount.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _allowance_total_sq():
+    """Correlated scalar subquery: SUM(days * rate) over the enclosing ShiftAllowances row's mappings."""
+    return (
+        select(func.coalesce(func.sum(ShiftMapping.days * func.coalesce(_mapping_rate_sq(), 0)), 0))
+        .where(ShiftMapping.shiftallowance_id == ShiftAllowances.id)
+        .scalar_subquery()
+    )
 
 
 def _recalculate_all_mappings(db: Session) -> None:
     """
     Recalculate total_allowance for ALL shift_mapping rows.
 
-     Note: This can be heavy on large data. Keeping as-is as per your file.
+    Runs as a single server-side UPDATE (days * rate via a correlated
+    subquery on ShiftsAmount); shift types without a rate get 0.
     """
-    rates = _load_shift_rates(db)
-
-    rows = db.query(ShiftMapping).all()
-    for row in rows:
-        days = float(row.days or 0.0)
-        stype = (row.shift_type or "").upper().strip()
-        rate = float(rates.get(stype, 0.0))
-        row.total_allowance = days * rate
-
+    stmt = (
+        update(ShiftMapping)
+        .values(total_allowance=func.coalesce(ShiftMapping.days, 0) * func.coalesce(_mapping_rate_sq(), 0))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(stmt)
     db.commit()
 
 
@@ -67,87 +81,123 @@ def _build_shift_display_map() -> Dict[str, str]:
     Example:
         PST_MST -> "PST/MST\n(07 PM - 06 AM)\nINR 700"
     """
-    keys = [k.upper().strip() for k in get_all_shift_keys()]
-    return {k: (get_shift_string(k) or k) for k in keys}
+    return {k: (get_shift_string(k) or k) for k in _SHIFT_KEYS}
 
 
-def fetch_shift_data(db: Session, start: int, limit: int):
-    """Fetch paginated shift records for the latest available duration month."""
-    current_month = datetime.now().strftime("%Y-%m")
+# Shift config is static for the process lifetime; build these once at import.
+_SHIFT_KEYS = tuple(k.upper().strip() for k in get_all_shift_keys())
+_SHIFT_KEY_SET = frozenset(_SHIFT_KEYS)
+_SHIFT_DISPLAY_MAP = _build_shift_display_map()
 
-    has_current = (
-        db.query(ShiftAllowances)
-        .filter(func.to_char(ShiftAllowances.duration_month, "YYYY-MM") == current_month)
-        .first()
-    )
+# Client full name -> Company enum key (e.g. "ILC Dover" -> "ILC_DOVER")
+_COMPANY_BY_VALUE: Dict[str, str] = {c.value: c.name for c in Company}
 
-    if has_current:
-        selected_month = current_month
-        message = None
-    else:
-        latest = (
-            db.query(func.to_char(ShiftAllowances.duration_month, "YYYY-MM"))
-            .order_by(func.to_char(ShiftAllowances.duration_month, "YYYY-MM").desc())
-            .first()
-        )
-        if not latest:
-            raise HTTPException(status_code=404, detail="No shift data is available.")
-        selected_month = latest[0]
-        message = f"No data found for current month {current_month}"
 
-    rates = _load_shift_rates(db)
+def _parse_year_month(value: str) -> date:
+    """Parse 'YYYY-MM' into the first day of that month (C-level parser; raises ValueError)."""
+    if not isinstance(value, str) or len(value) != 7 or value[4] != "-":
+        raise ValueError(f"Invalid month {value!r}. Expected YYYY-MM")
+    return date.fromisoformat(value + "-01")
 
-    _recalculate_all_mappings(db)
 
-    base_q = (
-        db.query(ShiftAllowances)
-        .options(joinedload(ShiftAllowances.shift_mappings))
-        .filter(func.to_char(ShiftAllowances.duration_month, "YYYY-MM") == selected_month)
+def _month_bounds(month_start: date) -> Tuple[date, date]:
+    """Return [first day of month, first day of next month) for index-friendly range filters."""
+    return month_start, month_start + relativedelta(months=1)
+
+
+# Page/count statements are built once so SQLAlchemy reuses the compiled SQL per request
+_FETCH_PAGE_BASE = (
+    select(ShiftAllowances, _allowance_total_sq().label("total_allowance"))
+    .options(selectinload(ShiftAllowances.shift_mappings), raiseload("*"))
+    .where(
+        ShiftAllowances.duration_month >= bindparam("start_m"),
+        ShiftAllowances.duration_month < bindparam("end_m"),
     )
+    .order_by(ShiftAllowances.id.asc())
+    .limit(bindparam("lim"))
+)
 
-    total_records = base_q.count()
-    records = base_q.order_by(ShiftAllowances.id.asc()).offset(start).limit(limit).all()
+# OFFSET paging (random page jumps) and keyset paging (id > cursor, no rows skipped)
+_FETCH_PAGE_STMT = _FETCH_PAGE_BASE.offset(bindparam("off"))
+_FETCH_PAGE_AFTER_STMT = _FETCH_PAGE_BASE.where(ShiftAllowances.id > bindparam("after_id"))
 
-    result = []
-    for rec in records:
-        mappings = rec.shift_mappings or []
+_FETCH_COUNT_STMT = select(func.count(ShiftAllowances.id)).where(
+    ShiftAllowances.duration_month >= bindparam("start_m"),
+    ShiftAllowances.duration_month < bindparam("end_m"),
+)
 
-        shift_details: Dict[str, float] = {}
-        total_allowance = 0.0
 
-        for m in mappings:
-            days = float(m.days or 0.0)
-            stype = (m.shift_type or "").upper().strip()
-            rate = float(rates.get(stype, 0.0))
-            m.total_allowance = days * rate
-            total_allowance += m.total_allowance
+def fetch_shift_data(db: Session, start: int, limit: int, after_id: Optional[int] = None):
+    """
+    Fetch paginated shift records for the latest available duration month.
 
-            if days > 0:
-                shift_details[stype] = days
+    When after_id is given, rows are fetched by keyset (id > after_id) and start is ignored;
+    otherwise start is used as an OFFSET. The returned next_cursor is the last id of the page.
+    """
+    now = datetime.now()
+    current_month = now.strftime("%Y-%m")
+    current_start, current_end = _month_bounds(date(now.year, now.month, 1))
 
-        db.commit() 
+    has_current = (
+        db.query(ShiftAllowances.id)
+        .filter(
+            ShiftAllowances.duration_month >= current_start,
+            ShiftAllowances.duration_month < current_end,
+        )
+        .first()
+    )
 
-        client_name = rec.client
-        abbr = next((c.name for c in Company if c.value == client_name), None)
-        if abbr:
-            client_name = abbr
+    if has_current:
+        selected_month = current_month
+        message = None
+    else:
+        latest_dt = db.query(func.max(ShiftAllowances.duration_month)).scalar()
+        if not latest_dt:
+            raise HTTPException(status_code=404, detail="No shift data is available.")
+        selected_month = latest_dt.strftime("%Y-%m")
+        message = f"No data found for current month {current_month}"
 
-        client_partner_val = getattr(rec, "client_partner", None) or getattr(rec, "account_manager", None)
+    _recalculate_mappings_if_rates_changed(db)
 
-        result.append({
-            "id": rec.id,
-            "emp_id": rec.emp_id,
-            "emp_name": rec.emp_name,
-            "department": rec.department,
-            "payroll_month": rec.payroll_month.strftime("%Y-%m") if rec.payroll_month else None,
-            "client": client_name,
-            "client_partner": client_partner_val,
-            "duration_month": rec.duration_month.strftime("%Y-%m") if rec.duration_month else None,
-            "total_allowance": float(total_allowance),
-            "shift_details": shift_details
-        })
+    month_start, month_end = _month_bounds(_parse_year_month(selected_month))
 
-    return selected_month, total_records, result, message
+    month_params = {"start_m": month_start, "end_m": month_end}
+    total_records = db.execute(_FETCH_COUNT_STMT, month_params).scalar_one()
+    if after_id is not None:
+        records = db.execute(
+            _FETCH_PAGE_AFTER_STMT, {**month_params, "after_id": after_id, "lim": limit}
+        ).all()
+    else:
+        records = db.execute(_FETCH_PAGE_STMT, {**month_params, "off": start, "lim": limit}).all()
+    next_cursor = records[-1][0].id if records else None
+
+    result = []
+    with db.no_autoflush:
+        for rec, total_allowance in records:
+            shift_details: Dict[str, float] = {}
+            for m in rec.shift_mappings or []:
+                days = m.days or 0.0
+                if days > 0:
+                    shift_details[m.shift_type] = days
+
+            client_name = _COMPANY_BY_VALUE.get(rec.client, rec.client)
+
+            client_partner_val = getattr(rec, "client_partner", None) or getattr(rec, "account_manager", None)
+
+            result.append({
+                "id": rec.id,
+                "emp_id": rec.emp_id,
+                "emp_name": rec.emp_name,
+                "department": rec.department,
+                "payroll_month": rec.payroll_month.strftime("%Y-%m") if rec.payroll_month else None,
+                "client": client_name,
+                "client_partner": client_partner_val,
+                "duration_month": rec.duration_month.strftime("%Y-%m") if rec.duration_month else None,
+                "total_allowance": float(total_allowance),
+                "shift_details": shift_details
+            })
+
+    return selected_month, total_records, result, message, next_cursor
 
 
 def parse_shift_value(value: Any) -> float:
@@ -193,14 +243,6 @@ def validate_not_future_month(month_date: date, field_name: str):
         raise HTTPException(status_code=400, detail=f"{field_name} cannot be a future month")
 
 
-def _load_shift_rates(db: Session) -> Dict[str, float]:
-    """
-    Load rates from ShiftsAmount once and map to UPPER shift keys.
-    """
-    rows = db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).all()
-    return {(stype or "").upper().strip(): float(amount or 0.0) for stype, amount in rows}
-
-
 def update_shift_service(
     db: Session,
     emp_id: str,
@@ -218,31 +260,35 @@ def update_shift_service(
         { "shifts": { ... } }  -> updates = payload["shifts"]
     """
 
-    valid_keys = {k.upper().strip() for k in get_all_shift_keys()}
-    unknown = [orig for orig in updates.keys() if (orig or "").upper().strip() not in valid_keys]
+    unknown = [orig for orig in updates.keys() if (orig or "").upper().strip() not in _SHIFT_KEY_SET]
     if unknown:
         raise HTTPException(status_code=400, detail=f"Invalid shift types: {unknown}")
 
   
     parsed: Dict[str, float] = {}
     for k, v in updates.items():
-        key = (k or "").upper().strip()
-        val = parse_shift_value(v)
-        validate_half_day(val, key)
-        parsed[key] = float(val)
+        parsed[(k or "").upper().strip()] = parse_shift_value(v)
+
+    # Half-day and total-days checks run over all values at once
+    days_arr = np.fromiter(parsed.values(), dtype=np.float64, count=len(parsed))
+    not_half = np.flatnonzero(np.mod(days_arr * 2, 1) != 0)
+    if not_half.size:
+        idx = int(not_half[0])
+        validate_half_day(float(days_arr[idx]), list(parsed)[idx])
+    requested_days = float(days_arr.sum())
 
   
     try:
-        payroll_dt = datetime.strptime(payroll_month, "%Y-%m").date().replace(day=1)
-    except Exception as exc:
+        payroll_dt = _parse_year_month(payroll_month)
+    except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid payroll_month format. Use YYYY-MM") from exc
 
     if not duration_month:
         raise HTTPException(status_code=400, detail="duration_month is required")
 
     try:
-        duration_dt = datetime.strptime(duration_month, "%Y-%m").date().replace(day=1)
-    except Exception as exc:
+        duration_dt = _parse_year_month(duration_month)
+    except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid duration_month format. Use YYYY-MM") from exc
 
     validate_not_future_month(duration_dt, "duration_month")
@@ -256,11 +302,11 @@ def update_shift_service(
 
 
     max_days_in_month = monthrange(duration_dt.year, duration_dt.month)[1]
-    if sum(parsed.values()) > max_days_in_month:
+    if requested_days > max_days_in_month:
         raise HTTPException(
             status_code=400,
             detail=(
-                f"Total days ({sum(parsed.values())}) cannot exceed "
+                f"Total days ({requested_days}) cannot exceed "
                 f"{max_days_in_month} days of duration month."
             ),
         )
@@ -278,38 +324,33 @@ def update_shift_service(
     if not rec:
         raise HTTPException(status_code=404, detail=f"No shift record found for employee {emp_id}")
 
-    rates = _load_shift_rates(db)
+    rates = load_shift_rates(db)
 
 
-    existing = {(m.shift_type or "").upper().strip(): m for m in (rec.shift_mappings or [])}
+    existing = {m.shift_type: m for m in (rec.shift_mappings or [])}
 
+    # Update existing mappings in place, collect new ones for a single bulk insert
+    new_rows: List[ShiftMapping] = []
     for stype, days in parsed.items():
         if stype in existing:
-            mapping = existing[stype]
-            mapping.days = days
+            existing[stype].days = days
         else:
-            mapping = ShiftMapping(
-                shiftallowance_id=rec.id,
-                shift_type=stype,
-                days=days,
-                total_allowance=0.0,
+            new_rows.append(
+                ShiftMapping(
+                    shiftallowance_id=rec.id,
+                    shift_type=stype,
+                    days=days,
+                    total_allowance=0.0,
+                )
             )
-            db.add(mapping)
-            existing[stype] = mapping
-
-        rate = float(rates.get(stype, 0.0))
-        mapping.total_allowance = float(days) * rate
-
-    rec.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(rec)
 
     total_days = 0.0
     total_allowance = 0.0
     details: List[Dict[str, Union[str, float]]] = []
 
-    for m in rec.shift_mappings or []:
-        days = float(m.days or 0.0)
+    # Totals come from the in-memory final state (existing + new), so no refresh is needed
+    for m in list(rec.shift_mappings or []) + new_rows:
+        days = m.days or 0.0
         total_days += days
 
         if total_days > max_days_in_month:
@@ -321,19 +362,24 @@ def update_shift_service(
                 ),
             )
 
-        stype = (m.shift_type or "").upper().strip()
-        rate = float(rates.get(stype, 0.0))
-        m.total_allowance = float(days) * rate
-        total_allowance += m.total_allowance
+        stype = m.shift_type
+        rate = rates.get(stype, 0.0)
+        line_total = days * rate
+        m.total_allowance = line_total
+        total_allowance += line_total
 
         details.append(
             {
                 "shift": stype,
                 "days": days,
-                "total": float(m.total_allowance),
+                "total": line_total,
             }
         )
 
+    if new_rows:
+        db.bulk_save_objects(new_rows)
+
+    rec.updated_at = datetime.utcnow()
     db.commit()
 
     return {
@@ -347,14 +393,14 @@ def update_shift_service(
 def fetch_shift_record(emp_id: str, duration_month: str, payroll_month: str, db: Session):
     """Fetch a single employee shift record with allowance breakdown (dynamic shift keys)."""
     try:
-        duration_dt = datetime.strptime(duration_month + "-01", "%Y-%m-%d").date()
-        payroll_dt = datetime.strptime(payroll_month + "-01", "%Y-%m-%d").date()
-    except Exception as exc:
+        duration_dt = _parse_year_month(duration_month)
+        payroll_dt = _parse_year_month(payroll_month)
+    except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid month format. Expected YYYY-MM") from exc
 
     rec = (
         db.query(ShiftAllowances)
-        .options(joinedload(ShiftAllowances.shift_mappings))
+        .options(joinedload(ShiftAllowances.shift_mappings), raiseload("*"))
         .filter(
             ShiftAllowances.emp_id == emp_id,
             ShiftAllowances.duration_month == duration_dt,
@@ -365,28 +411,18 @@ def fetch_shift_record(emp_id: str, duration_month: str, payroll_month: str, db:
     if not rec:
         raise HTTPException(status_code=404, detail="Record not found")
 
-    rates = _load_shift_rates(db)
+    rates = load_shift_rates(db)
 
-    shift_keys = [k.upper().strip() for k in get_all_shift_keys()]
-    breakdown = {k: 0.0 for k in shift_keys}
+    breakdown = {k: 0.0 for k in _SHIFT_KEYS}
 
     total_allowance = 0.0
 
-    for m in rec.shift_mappings or []:
-        stype = (m.shift_type or "").upper().strip()
-        days = float(m.days or 0.0)
-        rate = float(rates.get(stype, 0.0))
-
-        m.total_allowance = days * rate
-        total_allowance += m.total_allowance
-
-        if stype in breakdown:
-            breakdown[stype] = days
-        else:
-           
-            breakdown[stype] = days
-
-    db.commit()
+    # Read-only: totals are computed locally, the ORM objects are never mutated
+    with db.no_autoflush:
+        for m in rec.shift_mappings or []:
+            days = m.days or 0.0
+            total_allowance += days * rates.get(m.shift_type, 0.0)
+            breakdown[m.shift_type] = days
 
     client_partner_val = getattr(rec, "client_partner", None) or getattr(rec, "account_manager", None)
 
@@ -396,7 +432,7 @@ def fetch_shift_record(emp_id: str, duration_month: str, payroll_month: str, db:
         "emp_name": rec.emp_name,
         "grade": rec.grade,
         "department": rec.department,
-        "client": next((c.name for c in Company if c.value == rec.client), rec.client),
+        "client": _COMPANY_BY_VALUE.get(rec.client, rec.client),
         "project": rec.project,
         "project_code": rec.project_code,
         "client_partner": client_partner_val,
@@ -416,6 +452,15 @@ def fetch_shift_record(emp_id: str, duration_month: str, payroll_month: str, db:
     return out
 
 
+@lru_cache(maxsize=128)
+def _excel_column_width(col_name: str) -> int:
+    """Column width from the longest header line, clamped to [12, 45]."""
+    if col_name in ("practice_remarks", "rmg_comments"):
+        return 45
+    longest = max((len(x) for x in col_name.split("\n")), default=len(col_name))
+    return min(max(longest + 2, 12), 45)
+
+
 def generate_employee_shift_excel(emp_id: str, duration_month: str, payroll_month: str, db: Session):
     """
     Generate and stream an Excel file for an employee shift record.
@@ -429,12 +474,12 @@ def generate_employee_shift_excel(emp_id: str, duration_month: str, payroll_mont
     rec = fetch_shift_record(emp_id, duration_month, payroll_month, db)
 
     if rec.get("duration_month"):
-        rec["duration_month"] = datetime.strptime(rec["duration_month"], "%Y-%m").strftime("%b'%y")
+        rec["duration_month"] = _parse_year_month(rec["duration_month"]).strftime("%b'%y")
     if rec.get("payroll_month"):
-        rec["payroll_month"] = datetime.strptime(rec["payroll_month"], "%Y-%m").strftime("%b'%y")
+        rec["payroll_month"] = _parse_year_month(rec["payroll_month"]).strftime("%b'%y")
 
-    shift_keys = [k.upper().strip() for k in get_all_shift_keys()]
-    shift_display_map = _build_shift_display_map()
+    shift_keys = _SHIFT_KEYS
+    shift_display_map = _SHIFT_DISPLAY_MAP
 
     core_cols = [
         "id", "emp_id", "emp_name", "grade", "department", "client",
@@ -444,66 +489,51 @@ def generate_employee_shift_excel(emp_id: str, duration_month: str, payroll_mont
         "created_at", "updated_at", "total_allowance"
     ]
 
-    row = {c: rec.get(c) for c in core_cols}
-
-   
-    for k in shift_keys:
-        row[shift_display_map.get(k, k)] = rec.get(k, 0.0)
-
-    df = pd.DataFrame([row])
+    columns = core_cols + [shift_display_map.get(k, k) for k in shift_keys]
+    values = [rec.get(c) for c in core_cols] + [rec.get(k, 0.0) for k in shift_keys]
 
     output = BytesIO()
     sheet_name = "Shift Details"
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        header_fmt = workbook.add_format({
-            "text_wrap": True,
-            "align": "center",
-            "valign": "vcenter",
-            "bold": True,
-            "border": 1,
-            "bg_color": "#EDEDED",
-        })
-
-        cell_fmt = workbook.add_format({
-            "align": "center",
-            "valign": "vcenter",
-            "border": 1,
-        })
-
-        money_fmt = workbook.add_format({
-            "num_format": '₹ #,##0.00',
-            "align": "center",
-            "valign": "vcenter",
-            "border": 1,
-        })
-
-   
-        for col_idx, col_name in enumerate(df.columns):
-            worksheet.write(0, col_idx, col_name, header_fmt)
-
-        worksheet.set_row(0, 60)
-        worksheet.freeze_panes(1, 0)
-
-      
-        for col_idx, col_name in enumerate(df.columns):
-            lines = str(col_name).split("\n")
-            longest = max((len(x) for x in lines), default=len(str(col_name)))
-            width = min(max(longest + 2, 12), 45)
-
-            if str(col_name) in ("practice_remarks", "rmg_comments"):
-                width = 45
-
-            if str(col_name) == "total_allowance":
-                worksheet.set_column(col_idx, col_idx, width, money_fmt)
-            else:
-                worksheet.set_column(col_idx, col_idx, width, cell_fmt)
-
+    workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+    worksheet = workbook.add_worksheet(sheet_name)
+
+    header_fmt = workbook.add_format({
+        "text_wrap": True,
+        "align": "center",
+        "valign": "vcenter",
+        "bold": True,
+        "border": 1,
+        "bg_color": "#EDEDED",
+    })
+
+    cell_fmt = workbook.add_format({
+        "align": "center",
+        "valign": "vcenter",
+        "border": 1,
+    })
+
+    money_fmt = workbook.add_format({
+        "num_format": '₹ #,##0.00',
+        "align": "center",
+        "valign": "vcenter",
+        "border": 1,
+    })
+
+    for col_idx, col_name in enumerate(columns):
+        worksheet.write(0, col_idx, col_name, header_fmt)
+
+    worksheet.set_row(0, 60)
+    worksheet.freeze_panes(1, 0)
+
+    col_fmts = [money_fmt if name == "total_allowance" else cell_fmt for name in columns]
+    for col_idx, (col_name, fmt) in enumerate(zip(columns, col_fmts)):
+        worksheet.set_column(col_idx, col_idx, _excel_column_width(col_name), fmt)
+
+    for col_idx, (value, fmt) in enumerate(zip(values, col_fmts)):
+        worksheet.write(1, col_idx, value, fmt)
+
+    workbook.close()
     output.seek(0)
 
     filename = f"{emp_id}_{duration_month}_{payroll_month}_shift_data.xlsx"
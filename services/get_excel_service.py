@@ -11,20 +11,26 @@ Fixes:
 
 from __future__ import annotations
 
+import gzip
 import os
 import re
+import shutil
 import tempfile
+import uuid
 from typing import Optional, Dict, List, Tuple, Any
 
 import pandas as pd
-from datetime import datetime
+import xlsxwriter
+from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
-from fastapi import HTTPException
-from sqlalchemy import func
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+from sqlalchemy import Float, cast, func, select
 from sqlalchemy.orm import Session
 from diskcache import Cache
 
 from models.models import ShiftAllowances, ShiftMapping, ShiftsAmount
+from services.shift_rates import load_shift_rates
 from utils.shift_config import get_shift_string, get_all_shift_keys
 
 cache = Cache("./diskcache/latest_month")
@@ -33,6 +39,31 @@ EXPORT_DIR = "exports"
 DEFAULT_EXPORT_FILE = "shift_data_latest.xlsx"
 LATEST_MONTH_KEY = "shift_data:latest_month"
 CACHE_TTL = 24 * 60 * 60  # 24 hours
+EXPORT_CHUNK_ROWS = 5000
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+# Output column order ahead of the per-shift day columns
+_RECORD_COLUMNS = (
+    "emp_id",
+    "emp_name",
+    "grade",
+    "department",
+    "client",
+    "project",
+    "project_code",
+    "client_partner",
+    "duration_month",
+    "payroll_month",
+    "shift_details",
+    "total_days",
+    "total_allowance",
+    "delivery_manager",
+    "practice_lead",
+    "billability_status",
+    "practice_remarks",
+    "rmg_comments",
+)
 
 
 
@@ -40,9 +71,8 @@ def invalidate_shift_excel_cache() -> None:
     cache.pop(f"{LATEST_MONTH_KEY}:excel", None)
 
 
-
 def _get_db_latest_ym(db: Session) -> Optional[str]:
-    dt = db.query(func.max(func.date_trunc("month", ShiftAllowances.duration_month))).scalar()
+    dt = db.query(func.max(ShiftAllowances.duration_month)).scalar()
     return dt.strftime("%Y-%m") if dt else None
 
 
@@ -54,16 +84,26 @@ def _parse_month(month: str, field_name: str) -> datetime:
 
 
 def _build_shift_display_map() -> Dict[str, str]:
-    keys = get_all_shift_keys()
-    return {k: (get_shift_string(k) or k) for k in keys}
+    return {k: (get_shift_string(k) or k) for k in _SHIFT_KEYS}
+
+
+# Shift config is static for the process lifetime; build these once at import.
+_SHIFT_KEYS = tuple(get_all_shift_keys())
+_SHIFT_KEY_SET = frozenset(k.upper() for k in _SHIFT_KEYS)
+_SHIFT_DISPLAY_MAP = _build_shift_display_map()
+_SHIFT_HEADERS = tuple(_SHIFT_DISPLAY_MAP[k] for k in _SHIFT_KEYS)
+_ORDERED_COLS = pd.Index(_RECORD_COLUMNS + _SHIFT_HEADERS)
+
+# Low-cardinality text columns held as pandas categoricals during export
+_CATEGORY_COLS = ("grade", "department", "client", "client_partner", "billability_status")
 
 
-def _latest_available_month_dt(db: Session, base_filters: List[Any], current_month: datetime) -> datetime:
-    cutoff = current_month - relativedelta(months=11)
+def _latest_available_month_dt(db: Session, base_filters: List[Any], current_month: datetime) -> date:
+    cutoff = (current_month - relativedelta(months=11)).date()
     latest = (
-        db.query(func.max(func.date_trunc("month", ShiftAllowances.duration_month)))
+        db.query(func.max(ShiftAllowances.duration_month))
         .filter(*base_filters)
-        .filter(func.date_trunc("month", ShiftAllowances.duration_month) >= cutoff)
+        .filter(ShiftAllowances.duration_month >= cutoff)
         .scalar()
     )
     if not latest:
@@ -122,70 +162,78 @@ def _validate_payload(payload: dict) -> None:
     else:
         raise HTTPException(status_code=400, detail="Invalid 'shifts' format")
 
-    valid = {k.upper() for k in get_all_shift_keys()}
-    invalid = [s for s in lst if s.upper() not in valid]
+    invalid = [s for s in lst if s.upper() not in _SHIFT_KEY_SET]
     if invalid:
         raise HTTPException(status_code=400, detail=f"Unknown shifts: {invalid}")
 
 
-def _is_default_cache_request(db: Session, payload: dict) -> bool:
-    """Cache only when ALL filters are empty and the month is latest DB month."""
+def _default_cache_candidate(payload: dict) -> Tuple[bool, Optional[str]]:
+    """
+    Pure (no DB) part of the default-cache check.
+    Returns (candidate, requested_ym): candidate is True when no filter is
+    applied and at most one month is selected; requested_ym is that month
+    (YYYY-MM) or None when no month was given.
+    """
 
     # If any filter is applied → NOT cacheable
     for fkey in ["clients", "departments", "shifts", "emp_id", "client_partner"]:
         if _normalize_multi(payload.get(fkey)):
-            return False
-
-    # Check month == latest DB month
-    latest_ym = _get_db_latest_ym(db)
-    if not latest_ym:
-        return False
+            return False, None
 
     years = payload.get("years")
     months = payload.get("months")
 
     if not years and not months:
-        return True
+        return True, None
 
     selected = _months_from_years_months(years, months)
     if len(selected) != 1:
-        return False
+        return False, None
 
-    return selected[0].strftime("%Y-%m") == latest_ym
+    return True, selected[0].strftime("%Y-%m")
 
 
-def _fetch_mappings_bulk(db: Session, allowance_ids: List[int]) -> Dict[int, List[Tuple[str, float]]]:
+def _read_sql_chunked(db: Session, stmt, index_col: str) -> pd.DataFrame:
     """
-    Fetch all ShiftMapping rows in ONE query.
-    Returns dict: allowance_id -> [(shift_type, days), ...]
+    Read a SELECT into a DataFrame through a server-side cursor,
+    EXPORT_CHUNK_ROWS rows at a time, concatenating once at the end.
     """
-    if not allowance_ids:
-        return {}
-
-    # ensure all IDs are ints
-    allowance_ids = [int(i) for i in allowance_ids if i is not None]
-
-    rows = (
-        db.query(
-            
-            ShiftMapping.shiftallowance_id,
-            ShiftMapping.shift_type,
-            ShiftMapping.days
-        )
-        .filter(ShiftMapping.shiftallowance_id.in_(allowance_ids))  
-        .all()
-    )
+    stmt = stmt.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+    chunks = pd.read_sql(stmt, db.connection(), index_col=index_col, chunksize=EXPORT_CHUNK_ROWS)
+    return pd.concat(list(chunks))
 
-    out: Dict[int, List[Tuple[str, float]]] = {}
-    for sid, stype, days in rows:
-        try:
-            sid_int = int(sid)
-        except (TypeError, ValueError):
-            continue
-        out.setdefault(sid_int, []).append(
-            ((stype or "").upper().strip(), float(days or 0.0))
+
+def _fetch_mapping_totals(db: Session, allowance_ids: List[int], shift_keys: List[str]) -> pd.DataFrame:
+    """
+    Aggregate ShiftMapping rows per allowance in ONE query.
+    Returns a DataFrame indexed by allowance id with one days column per
+    shift key (NaN when there is no mapping of that type), total_days and
+    total_amount (days * latest ShiftsAmount rate, 0 for unrated shifts).
+    """
+    # Normalized like the per-row code it replaced; shift_mapping_alloc_shift_key_idx
+    # indexes this exact expression
+    shift_key = func.upper(func.trim(ShiftMapping.shift_type))
+    rate_sq = (
+        select(ShiftsAmount.amount)
+        .where(func.upper(func.trim(ShiftsAmount.shift_type)) == shift_key)
+        .order_by(ShiftsAmount.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            ShiftMapping.shiftallowance_id.label("sid"),
+            *[
+                cast(func.sum(ShiftMapping.days).filter(shift_key == k), Float).label(k)
+                for k in shift_keys
+            ],
+            cast(func.sum(ShiftMapping.days), Float).label("total_days"),
+            cast(func.sum(ShiftMapping.days * func.coalesce(rate_sq, 0)), Float).label("total_amount"),
         )
-    return out
+        .where(ShiftMapping.shiftallowance_id.in_(allowance_ids))
+        .group_by(ShiftMapping.shiftallowance_id)
+    )
+    return _read_sql_chunked(db, stmt, index_col="sid")
 
 
 def export_filtered_excel_df(
@@ -198,9 +246,9 @@ def export_filtered_excel_df(
     client=None,
     payload=None,
 ):
-    shift_keys = get_all_shift_keys()
-    shift_header_map = _build_shift_display_map()
-    shift_headers = [shift_header_map[k] for k in shift_keys]
+    # list copies: pandas treats a tuple column selector as a single key
+    shift_keys = list(_SHIFT_KEYS)
+    shift_header_map = _SHIFT_DISPLAY_MAP
 
     base_filters: List[Any] = []
     join_shift_mapping = False
@@ -222,16 +270,16 @@ def export_filtered_excel_df(
         client_partners = _normalize_multi(payload.get("client_partner"))
 
         if clients:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.client)).in_(clients))
+            base_filters.append(ShiftAllowances.client_norm.in_(clients))
 
         if departments:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.department)).in_(departments))
+            base_filters.append(ShiftAllowances.department_norm.in_(departments))
 
         if emp_ids:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.emp_id)).in_(emp_ids))
+            base_filters.append(ShiftAllowances.emp_id_norm.in_(emp_ids))
 
         if client_partners:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.client_partner)).in_(client_partners))
+            base_filters.append(ShiftAllowances.client_partner_norm.in_(client_partners))
 
         if shifts:
             join_shift_mapping = True
@@ -241,11 +289,11 @@ def export_filtered_excel_df(
         month_list = _months_from_years_months(payload.get("years"), payload.get("months"))
 
         if month_list:
-            date_filter_clause = func.date_trunc("month", ShiftAllowances.duration_month).in_(month_list)
+            date_filter_clause = ShiftAllowances.duration_month.in_([m.date() for m in month_list])
         else:
             now = datetime.now().replace(day=1)
             latest_month = _latest_available_month_dt(db, base_filters, now)
-            date_filter_clause = func.date_trunc("month", ShiftAllowances.duration_month) == latest_month
+            date_filter_clause = ShiftAllowances.duration_month == latest_month
 
         sort_by = payload.get("sort_by") or "total_allowance"
         sort_order = payload.get("sort_order") or "default"
@@ -253,13 +301,13 @@ def export_filtered_excel_df(
     
     else:
         if emp_id:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.emp_id)) == emp_id.lower())
+            base_filters.append(ShiftAllowances.emp_id_norm == emp_id.strip().lower())
         if client_partner:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.client_partner)) == client_partner.lower())
+            base_filters.append(ShiftAllowances.client_partner_norm == client_partner.strip().lower())
         if department:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.department)) == department.lower())
+            base_filters.append(ShiftAllowances.department_norm == department.strip().lower())
         if client:
-            base_filters.append(func.lower(func.trim(ShiftAllowances.client)) == client.lower())
+            base_filters.append(ShiftAllowances.client_norm == client.strip().lower())
 
         now = datetime.now().replace(day=1)
         if start_month or end_month:
@@ -270,15 +318,12 @@ def export_filtered_excel_df(
                 em = _parse_month(end_month, "end_month")
                 if sm > em:
                     raise HTTPException(status_code=400, detail="start_month cannot be after end_month")
-                date_filter_clause = (
-                    (func.date_trunc("month", ShiftAllowances.duration_month) >= sm)
-                    & (func.date_trunc("month", ShiftAllowances.duration_month) <= em)
-                )
+                date_filter_clause = ShiftAllowances.duration_month.between(sm.date(), em.date())
             else:
-                date_filter_clause = func.date_trunc("month", ShiftAllowances.duration_month) == sm
+                date_filter_clause = ShiftAllowances.duration_month == sm.date()
         else:
             latest_month = _latest_available_month_dt(db, base_filters, now)
-            date_filter_clause = func.date_trunc("month", ShiftAllowances.duration_month) == latest_month
+            date_filter_clause = ShiftAllowances.duration_month == latest_month
 
    
     q = db.query(
@@ -308,83 +353,44 @@ def export_filtered_excel_df(
     if date_filter_clause is not None:
         q = q.filter(date_filter_clause)
 
-    rows = q.distinct().all()
-    if not rows:
+    # Load straight into columns; no ORM row objects are materialized
+    core_df = _read_sql_chunked(db, q.distinct().statement, index_col="id")
+    if core_df.empty:
         raise HTTPException(status_code=404, detail="No data found")
+    core_df = core_df.astype({c: "category" for c in _CATEGORY_COLS})
+
+    # Per-allowance day/amount aggregates, computed by Postgres
+    agg_df = _fetch_mapping_totals(db, core_df.index.tolist(), shift_keys).reindex(core_df.index)
+    rate_map = load_shift_rates(db)
+
+    # Long form (one row per allowance/shift) is only needed for the details text
+    map_df = (
+        agg_df[shift_keys]
+        .rename_axis("sid")
+        .reset_index()
+        .melt(id_vars="sid", var_name="shift_key", value_name="days")
+        .dropna(subset=["days"])
+    )
+    map_df["rate"] = map_df["shift_key"].map(rate_map).fillna(0.0)
+    map_df["amount"] = map_df["days"] * map_df["rate"]
+    map_df["piece"] = (
+        map_df["shift_key"]
+        + "-" + map_df["days"].map("{:g}".format)
+        + "*" + map_df["rate"].astype("int64").map("{:,}".format)
+        + "=₹" + map_df["amount"].astype("int64").map("{:,}".format)
+    )
+    details = map_df.groupby("sid")["piece"].agg(", ".join)
 
-    # Robust ID extraction for bulk mapping fetch
-    allowance_ids: List[int] = []
-    for r in rows:
-        rid = getattr(r, "id", None)
-        if rid is None and isinstance(r, (tuple, list)) and len(r) > 0:
-            rid = r[0]
-        if rid is not None:
-            try:
-                allowance_ids.append(int(rid))
-            except (TypeError, ValueError):
-                pass
+    df = core_df
+    for col in ("duration_month", "payroll_month"):
+        ym = pd.to_datetime(df[col]).dt.strftime("%Y-%m")
+        df[col] = ym.where(ym.notna(), None)
+    df["shift_details"] = details.reindex(df.index)
+    df["total_days"] = agg_df["total_days"].fillna(0.0)
+    df["total_allowance"] = agg_df["total_amount"].fillna(0.0).round(2)
 
-    # Bulk mapping and rates
-    maps = _fetch_mappings_bulk(db, allowance_ids)
-    rate_map = {
-        (item.shift_type or "").upper().strip(): float(item.amount or 0)
-        for item in db.query(ShiftsAmount).all()
-    }
-
-    # Build DF rows
-    out: List[Dict[str, Any]] = []
-    for r in rows:
-        # safe id per row
-        rid = getattr(r, "id", None)
-        if rid is None and isinstance(r, (tuple, list)) and len(r) > 0:
-            rid = r[0]
-
-        per_shift = {hdr: 0.0 for hdr in shift_headers}
-        shifts_desc: List[str] = []
-        total_days = 0.0
-        total_amt = 0.0
-
-        for stype, days in maps.get(int(rid) if rid is not None else -1, []):
-            rate = rate_map.get(stype, 0.0)
-            amt = float(days) * float(rate)
-
-            total_days += float(days)
-            total_amt += amt
-
-            shifts_desc.append(f"{stype}-{days:g}*{int(rate):,}=₹{int(amt):,}")
-
-            header = shift_header_map.get(stype, stype)
-            per_shift[header] = per_shift.get(header, 0.0) + float(days)
-
-        # Format dates safely
-        duration_month_str = r.duration_month.strftime("%Y-%m") if getattr(r, "duration_month", None) else None
-        payroll_month_str = r.payroll_month.strftime("%Y-%m") if getattr(r, "payroll_month", None) else None
-
-        rec = {
-            "emp_id": r.emp_id,
-            "emp_name": r.emp_name,
-            "grade": r.grade,
-            "department": r.department,
-            "client": r.client,
-            "project": r.project,
-            "project_code": r.project_code,
-            "client_partner": r.client_partner,
-            "duration_month": duration_month_str,
-            "payroll_month": payroll_month_str,
-            "shift_details": ", ".join(shifts_desc) if shifts_desc else None,
-            "total_days": float(total_days),
-            "total_allowance": float(round(total_amt, 2)),
-            "delivery_manager": r.delivery_manager,
-            "practice_lead": r.practice_lead,
-            "billability_status": r.billability_status,
-            "practice_remarks": r.practice_remarks,
-            "rmg_comments": r.rmg_comments,
-        }
-
-        rec.update(per_shift)
-        out.append(rec)
-
-    df = pd.DataFrame(out)
+    df = df.join(agg_df[shift_keys].fillna(0.0).rename(columns=shift_header_map))
+    df = df.reset_index(drop=True)[_ORDERED_COLS]
 
     # Sorting
     if sort_order == "default":
@@ -411,11 +417,20 @@ def dataframe_to_excel_file(
     if "total_allowance" in df.columns:
         df["total_allowance"] = pd.to_numeric(df["total_allowance"], errors="coerce")
 
-    with pd.ExcelWriter(file_path, engine="xlsxwriter") as w:
-        df.to_excel(w, sheet_name=sheet_name, index=False)
-
-        ws = w.sheets[sheet_name]
-        wb = w.book
+    columns = [str(c) for c in df.columns]
+    # NaN is not a valid XLSX number; write missing values as empty cells
+    data = df.astype(object).where(df.notna(), None)
+
+    # constant_memory flushes each row to disk as soon as the next one starts,
+    # so cells must be written in row order (see the write_row loop below).
+    wb = xlsxwriter.Workbook(file_path, {
+        "constant_memory": True,
+        "strings_to_urls": False,
+        "strings_to_formulas": False,
+        "strings_to_numbers": False,
+    })
+    try:
+        ws = wb.add_worksheet(sheet_name)
 
         header_fmt = wb.add_format({
             "bold": True,
@@ -434,21 +449,25 @@ def dataframe_to_excel_file(
         })
 
         # header
-        for c, col in enumerate(df.columns):
-            ws.write(0, c, col, header_fmt)
+        ws.write_row(0, 0, columns, header_fmt)
 
         ws.set_row(0, header_row_height)
         if freeze_header:
             ws.freeze_panes(1, 0)
 
-        # columns
-        for c, col in enumerate(df.columns):
+        # columns: width + format once per column; cells inherit it
+        for c, col in enumerate(columns):
             fmt = currency_fmt if col.lower() == "total_allowance" else cell_fmt
-            width = min(max(len(str(col)) + 2, 12), 45)
+            width = min(max(len(col) + 2, 12), 45)
             if col in ("shift_details", "practice_remarks", "rmg_comments"):
                 width = 45
             ws.set_column(c, c, width, fmt)
 
+        for r, row in enumerate(data.itertuples(index=False, name=None), start=1):
+            ws.write_row(r, 0, row)
+    finally:
+        wb.close()
+
     return file_path
 
 
@@ -471,6 +490,58 @@ def _atomic_write_excel(df: pd.DataFrame, final_path: str, sheet_name: str = "Sh
 
 
 
+def _atomic_write_gzip(src_path: str, final_path: str) -> str:
+    """Write a gzip copy of src_path next to it, published with os.replace."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(final_path) or ".", prefix=".tmp_", suffix=".gz")
+    os.close(fd)
+
+    try:
+        with open(src_path, "rb") as src, gzip.open(temp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(temp_path, final_path)
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except Exception:
+                pass
+
+    return final_path
+
+
+def build_excel_file_response(
+    request: Request,
+    file_path: str,
+    filename: str = "shift_data.xlsx",
+    stat_result: Optional[os.stat_result] = None,
+) -> FileResponse:
+    """
+    Serve an exported workbook. When the client accepts gzip and a
+    pre-compressed sibling (file_path + ".gz") at least as new as the
+    workbook exists, send that instead; the two files are published by
+    separate os.replace calls, so an older .gz belongs to a previous export.
+    stat_result (of file_path) is reused so Starlette skips its own stat.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        gz_path = f"{file_path}.gz"
+        try:
+            gz_stat = os.stat(gz_path)
+            if stat_result is None:
+                stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            gz_stat = None
+        if gz_stat is not None and gz_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+            headers["Content-Encoding"] = "gzip"
+            return FileResponse(
+                path=gz_path, media_type=XLSX_MEDIA_TYPE, filename=filename, headers=headers, stat_result=gz_stat
+            )
+
+    return FileResponse(
+        path=file_path, media_type=XLSX_MEDIA_TYPE, filename=filename, headers=headers, stat_result=stat_result
+    )
+
+
 def shift_excel_download_service(
     db: Session,
     emp_id=None,
@@ -480,21 +551,31 @@ def shift_excel_download_service(
     department=None,
     client=None,
     payload=None,
-) -> str:
-    """Main entry point."""
+) -> Tuple[str, Optional[os.stat_result]]:
+    """
+    Main entry point. Returns (file_path, stat_result); stat_result is set
+    on the cached fast path so the response does not need to stat again.
+    """
     if payload:
-        default_cache = _is_default_cache_request(db, payload)
+        candidate, requested_ym = _default_cache_candidate(payload)
     else:
-        default_cache = not any([emp_id, client_partner, start_month, end_month, department, client])
+        candidate = not any([emp_id, client_partner, start_month, end_month, department, client])
+        requested_ym = None
 
     cache_key = f"{LATEST_MONTH_KEY}:excel"
-    latest_ym = _get_db_latest_ym(db)
 
-    if default_cache:
-        cached = cache.get(cache_key)
-        if cached and cached.get("file_path") and cached.get("_cached_month") == latest_ym:
-            if os.path.exists(cached["file_path"]):
-                return cached["file_path"]
+    # Cached default export: served without touching the DB. Uploads call
+    # invalidate_shift_excel_cache(), so a live entry is for the latest month.
+    if candidate:
+        try:
+            cached_month, cached_path = cache[cache_key]
+            if requested_ym is None or requested_ym == cached_month:
+                return cached_path, os.stat(cached_path)
+        except (KeyError, FileNotFoundError):
+            pass
+
+    latest_ym = _get_db_latest_ym(db)
+    default_cache = candidate and latest_ym is not None and requested_ym in (None, latest_ym)
 
     df = export_filtered_excel_df(
         db=db,
@@ -511,11 +592,18 @@ def shift_excel_download_service(
     if default_cache:
         file_path = os.path.join(EXPORT_DIR, DEFAULT_EXPORT_FILE)
     else:
-        file_path = os.path.join(EXPORT_DIR, f"shift_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+        # unique per request: two filtered exports in the same second must not
+        # publish over each other
+        file_path = os.path.join(
+            EXPORT_DIR, f"shift_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.xlsx"
+        )
 
     _atomic_write_excel(df, file_path)
 
     if default_cache:
-        cache.set(cache_key, {"_cached_month": latest_ym, "file_path": file_path}, expire=CACHE_TTL)
+        # the cached file is served repeatedly, so compress it once up front
+        _atomic_write_gzip(file_path, f"{file_path}.gz")
+        # (month, path) tuple: smaller pickle than a dict
+        cache.set(cache_key, (latest_ym, file_path), expire=CACHE_TTL)
 
-    return file_path
\ No newline at end of file
+    return file_path, None
\ No newline at end of file
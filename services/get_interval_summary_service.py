@@ -15,9 +15,12 @@ import re
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from fastapi import HTTPException
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from models.models import ShiftAllowances
-from services.summary_service import get_client_shift_summary
+from services.summary_service import ACCOUNT_MANAGER_COL, get_client_shift_summary_range
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
 
 
 def get_interval_summary_service(
@@ -56,9 +59,9 @@ def get_interval_summary_service(
                                 detail="Account manager must contain only letters and spaces")
 
 
-        manager_exists = db.query(ShiftAllowances).filter(
-            ShiftAllowances.account_manager.ilike(f"%{account_manager}%")
-        ).first()
+        manager_exists = db.query(
+            exists().where(ACCOUNT_MANAGER_COL.ilike(f"%{account_manager}%"))
+        ).scalar()
 
         if not manager_exists:
             raise HTTPException(
@@ -73,7 +76,7 @@ def get_interval_summary_service(
         if " " in start_month:
             raise HTTPException(status_code=400, detail="Spaces are not allowed in start_month")
 
-        if not re.match(r"^\d{4}-\d{2}$", start_month):
+        if not _MONTH_RE.match(start_month):
             raise HTTPException(status_code=400, detail="Invalid start_month format. Use YYYY-MM")
 
         # DO NOT CHECK IF MONTH EXISTS — interval will handle missing months
@@ -83,7 +86,7 @@ def get_interval_summary_service(
     # END MONTH VALIDATION
 
     if end_month:
-        if not re.match(r"^\d{4}-\d{2}$", end_month):
+        if not _MONTH_RE.match(end_month):
             raise HTTPException(status_code=400, detail="Invalid end_month format. Use YYYY-MM")
 
 
@@ -102,7 +105,7 @@ def get_interval_summary_service(
         """
         query = db.query(ShiftAllowances.duration_month)
         if account_manager:
-            query = query.filter(ShiftAllowances.account_manager.ilike(f"%{account_manager}%"))
+            query = query.filter(ACCOUNT_MANAGER_COL.ilike(f"%{account_manager}%"))
 
         month = query.filter(
             ShiftAllowances.duration_month <= before
@@ -137,31 +140,18 @@ def get_interval_summary_service(
 
     # BUILD INTERVAL SUMMARY
 
+    # One batched fetch for the whole range; months without data get a message
+    summaries = get_client_shift_summary_range(db, start, end, account_manager)
+    manager_suffix = f" for manager {account_manager}" if account_manager else ""
+
     interval_summary = {}
     current = start
 
     while current <= end:
         month_str = current.strftime("%Y-%m")
-
-        try:
-            month_summary = get_client_shift_summary(
-                db,
-                duration_month=month_str,
-                account_manager=account_manager
-            )
-
-            # Unwrap {"YYYY-MM": [...]}
-            if isinstance(month_summary, dict) and month_str in month_summary:
-                month_summary = month_summary[month_str]
-
-            if not month_summary:
-                month_summary = [f"No records found for month '{month_str}'"]
-
-        except HTTPException as e:
-            # Instead of stopping, add error message inside output
-            month_summary = [str(e.detail)]
-
-        interval_summary[month_str] = month_summary
+        interval_summary[month_str] = summaries.get(month_str) or [
+            f"No records found for duration_month '{month_str}'{manager_suffix}"
+        ]
         current += relativedelta(months=1)
 
     return interval_summary
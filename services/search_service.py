@@ -14,16 +14,20 @@ Shift allowance export service with proper headcount and shift filtering.
 """
 
 import re
-from datetime import datetime, date
+from datetime import date
 from typing import List, Union, Optional, Dict, Any, Tuple, Set
 from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
 from decimal import Decimal, InvalidOperation
+import pandas as pd
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract
-from sqlalchemy.sql import exists
+from sqlalchemy import Integer, String, any_, bindparam, func, and_, or_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from models.models import ShiftAllowances, ShiftMapping, ShiftsAmount
+from models.models import ShiftAllowances, ShiftMapping
+from services.shift_rates import load_shift_rates
 from utils.client_enums import Company
 from utils.shift_config import get_all_shift_keys, get_shift_string
 
@@ -54,7 +58,27 @@ def normalize_company_name(client: str | None):
 
 
 
-_COMMA_SPLIT_RE = re.compile(r"[,\|]")
+# Pipes are treated as commas so a single str.split handles both separators
+_PIPE_TO_COMMA = str.maketrans({"|": ","})
+
+# Shift config is static for the process lifetime; normalize it once at import.
+_ALL_SHIFT_KEYS = tuple(k.upper().strip() for k in get_all_shift_keys())
+_ALLOWED_SHIFTS = frozenset(_ALL_SHIFT_KEYS)
+
+
+# Indexed generated column year*100 + month of duration_month; periods are
+# matched with ONE expanding IN so every period count compiles the same
+_DURATION_YM = ShiftAllowances.duration_ym
+
+
+def _like_any(column, values: List[str]):
+    """
+    column ILIKE ANY(:patterns) — case-insensitive substring match with one
+    array bind however many values. Plain ILIKE on the bare column (no UPPER())
+    lets Postgres use the pg_trgm GIN index on it.
+    """
+    patterns = [f"%{v.strip()}%" for v in values]
+    return column.ilike(any_(literal(patterns, type_=ARRAY(String))))
 
 
 def _normalize_to_list(value: Union[str, List[str], None]) -> Optional[List[str]]:
@@ -64,18 +88,15 @@ def _normalize_to_list(value: Union[str, List[str], None]) -> Optional[List[str]
     - Trims whitespace.
     - Drops empty values and the literal 'ALL'.
     """
-    if value is None:
+    if value is None or value == "ALL":
         return None
 
-    raw_items: List[str]
     if isinstance(value, list):
         raw_items = [str(v) for v in value]
     else:
-        s = str(value)
-        raw_items = [p for p in _COMMA_SPLIT_RE.split(s) if p is not None]
+        raw_items = str(value).translate(_PIPE_TO_COMMA).split(",")
 
-    vals = [v.strip() for v in raw_items if str(v).strip()]
-    vals = [v for v in vals if v.upper() != "ALL"]
+    vals = [v for v in (x.strip() for x in raw_items) if v and v.upper() != "ALL"]
     return vals or None
 
 
@@ -87,39 +108,36 @@ def apply_client_department_filters(query, clients=None, departments=None):
 
     conditions = []
     if client_values:
-        like_terms = []
-        for c in client_values:
-            norm = normalize_company_name(c) or c
-            like_terms.append(func.upper(ShiftAllowances.client).like(f"%{norm.strip().upper()}%"))
-        conditions.append(or_(*like_terms))
+        norms = [normalize_company_name(c) or c for c in client_values]
+        conditions.append(_like_any(ShiftAllowances.client, norms))
 
     if dept_values:
-        like_terms = [func.upper(ShiftAllowances.department).like(f"%{d.strip().upper()}%") for d in dept_values]
-        conditions.append(or_(*like_terms))
+        conditions.append(_like_any(ShiftAllowances.department, dept_values))
 
     if conditions:
         return query.filter(and_(*conditions))
     return query
 
 
+def _recent_yms(today: date, count: int) -> List[int]:
+    """duration_ym values for the current month and the (count - 1) months before it."""
+    base = today.year * 12 + today.month - 1
+    return [((base - i) // 12) * 100 + (base - i) % 12 + 1 for i in range(count)]
+
+
+def _latest_ym_in(q, candidates: List[int]) -> Optional[int]:
+    """Latest duration_ym among candidates that q (a ShiftAllowances query) has rows for; one round-trip."""
+    return q.with_entities(func.max(_DURATION_YM)).filter(_DURATION_YM.in_(candidates)).scalar()
+
+
 def get_default_start_month(db: Session) -> str:
     """
-    Walk backward up to 12 months from today and return the first YYYY-MM that exists.
+    Return the latest YYYY-MM with data within the 12 months ending today.
     """
-    today = datetime.now().replace(day=1)
-    for i in range(12):
-        y = today.year
-        m = today.month - i
-        if m <= 0:
-            m += 12
-            y -= 1
-        ym = f"{y:04d}-{m:02d}"
-        exists_row = db.query(ShiftAllowances.id).filter(
-            func.to_char(ShiftAllowances.duration_month, "YYYY-MM") == ym
-        ).first()
-        if exists_row:
-            return ym
-    raise HTTPException(404, "No data found in the last 12 months")
+    latest = _latest_ym_in(db.query(ShiftAllowances), _recent_yms(date.today(), 12))
+    if latest is None:
+        raise HTTPException(404, "No data found in the last 12 months")
+    return f"{latest // 100:04d}-{latest % 100:02d}"
 
 
 def _resolve_periods_with_meta(
@@ -145,7 +163,7 @@ def _resolve_periods_with_meta(
         current_ym = f"{today.year:04d}-{today.month:02d}"
         meta["current_month_attempted"] = current_ym
         has_current = db.query(ShiftAllowances.id).filter(
-            func.to_char(ShiftAllowances.duration_month, "YYYY-MM") == current_ym
+            _DURATION_YM == today.year * 100 + today.month
         ).first()
         if has_current:
             return [(today.year, today.month)], meta
@@ -245,76 +263,64 @@ def _apply_headcount_filter(
             allowed_indices.update(range(lo, hi + 1))
         return [e for i, e in enumerate(unique_employees, start=1) if i in allowed_indices]
 
+    # Normalize each employee's group once; the same list feeds counts and filtering
     group_vals = [str(emp.get(group_key) or "UNKNOWN").upper() for emp in unique_employees]
     counts = Counter(group_vals)
-    allowed_groups = set()
-    for grp, cnt in counts.items():
-        for lo, hi in ranges:
-            if lo <= cnt <= hi:
-                allowed_groups.add(grp.upper())
-                break
-    return [emp for emp in unique_employees if str(emp.get(group_key) or "UNKNOWN").upper() in allowed_groups]
+    allowed_groups = {
+        grp for grp, cnt in counts.items()
+        if any(lo <= cnt <= hi for lo, hi in ranges)
+    }
+    if len(allowed_groups) == len(counts):
+        return unique_employees
+    return [emp for grp, emp in zip(group_vals, unique_employees) if grp in allowed_groups]
 
 
  
 
-def _compute_row_totals(
+def _fetch_emp_shift_days(
     db: Session,
-    row,
-    rates: Dict[str, float],
+    allowance_ids: List[int],
     selected_shifts: Optional[Set[str]]
-):
+) -> List[Tuple[str, str, float]]:
     """
-    Compute totals for a single ShiftAllowances row.
-    Only mappings whose SHIFT KEY is in selected_shifts (if provided) are counted.
+    Sum mapping days per (emp_id, SHIFT_KEY) over the given allowance rows in ONE query.
+    Only days > 0 are counted, and only selected_shifts (if provided).
+    Returns [(emp_id, SHIFT_KEY, days), ...]
     """
-    shift_days: Dict[str, float] = {}
-    shift_amount: Dict[str, float] = {}
-    total = 0.0
-
-    mappings = db.query(ShiftMapping).filter(
-        ShiftMapping.shiftallowance_id == row.id
-    ).all()
-
-    for m in mappings:
-        days = float(m.days or 0)
-        if days <= 0:
-            continue
-
-        shift_key = (m.shift_type or "").upper().strip()
-
-        # Apply selected shifts filter
-        if selected_shifts is not None and shift_key not in selected_shifts:
-            continue
-
-        rate = float(rates.get(shift_key, 0.0))
-        amount = days * rate
-
-        shift_days[shift_key] = shift_days.get(shift_key, 0.0) + days
-        shift_amount[shift_key] = shift_amount.get(shift_key, 0.0) + amount
-        total += amount
-
-    return shift_days, shift_amount, total
+    if not allowance_ids:
+        return []
+
+    shift_key = func.upper(func.trim(ShiftMapping.shift_type))
+    q = (
+        db.query(ShiftAllowances.emp_id, shift_key, func.sum(ShiftMapping.days))
+        .join(ShiftMapping, ShiftMapping.shiftallowance_id == ShiftAllowances.id)
+        .filter(
+            ShiftAllowances.id == any_(bindparam("ids", allowance_ids, type_=ARRAY(Integer))),
+            ShiftMapping.days > 0,
+        )
+    )
+    if selected_shifts is not None:
+        q = q.filter(shift_key.in_(sorted(selected_shifts)))
 
+    q = q.group_by(ShiftAllowances.emp_id, shift_key).order_by(ShiftAllowances.emp_id, shift_key)
+    return [(emp_id, key, float(days)) for emp_id, key, days in q.all()]
 
-def _aggregate_unique_employees(
-    db: Session,
-    rows,
-    rates: Dict[str, float],
-    selected_shifts: Optional[Set[str]]
-) -> List[Dict[str, Any]]:
-    def _ym_to_key(ym: str) -> Tuple[int, int]:
-        y, m = ym.split("-")
-        return int(y), int(m)
 
+def _collect_latest_rows(rows) -> Tuple[Dict[str, Dict[str, Any]], List[int]]:
+    """
+    Single pass over (possibly streamed) allowance rows.
+    Returns (emp_id -> entry built from the employee's latest row, all row ids).
+    Months are compared as integer duration_ym and formatted once per employee.
+    """
     agg: Dict[str, Dict[str, Any]] = {}
+    allowance_ids: List[int] = []
 
     for row in rows:
-        row_shift_days, row_shift_amount, row_total = _compute_row_totals(db, row, rates, selected_shifts)
+        allowance_ids.append(row.id)
         emp_id = row.emp_id
-        latest_ym = row.duration_month
+        cur = agg.get(emp_id)
 
-        if emp_id not in agg:
+        if cur is None:
             agg[emp_id] = {
                 "emp_id": row.emp_id,
                 "emp_name": row.emp_name,
@@ -322,71 +328,88 @@ def _aggregate_unique_employees(
                 "client": row.client or "UNKNOWN",
                 "project": row.project,
                 "client_partner": row.client_partner,
-                "duration_month": row.duration_month,
+                "duration_month": row.duration_ym,
                 "payroll_month": row.payroll_month,
-                "shift_days": dict(row_shift_days),
-                "shift_details": dict(row_shift_amount),
-                "total_allowance": float(row_total),
-                "_latest_key": _ym_to_key(latest_ym),
+                "shift_days": {},
+                "shift_details": {},
+                "total_allowance": 0.0,
             }
-        else:
-            cur = agg[emp_id]
-            for k, v in row_shift_days.items():
-                cur["shift_days"][k] = cur["shift_days"].get(k, 0.0) + v
-            for k, v in row_shift_amount.items():
-                cur["shift_details"][k] = cur["shift_details"].get(k, 0.0) + v
-            cur["total_allowance"] += float(row_total)
-
-            if _ym_to_key(latest_ym) > cur["_latest_key"]:
-                cur["_latest_key"] = _ym_to_key(latest_ym)
-                cur["department"] = row.department or "UNKNOWN"
-                cur["client"] = row.client or "UNKNOWN"
-                cur["project"] = row.project
-                cur["client_partner"] = row.client_partner
-                cur["duration_month"] = row.duration_month
-                cur["payroll_month"] = row.payroll_month
-
-    unique_employees: List[Dict[str, Any]] = []
-    for emp in agg.values():
-        emp["shift_days"] = {k: round(v, 2) for k, v in emp["shift_days"].items()}
-        emp["shift_details"] = {k: round(v, 2) for k, v in emp["shift_details"].items()}
-        emp["total_allowance"] = round(float(emp["total_allowance"]), 2)
-        emp.pop("_latest_key", None)
-        unique_employees.append(emp)
-
-    return unique_employees
+        elif row.duration_ym > cur["duration_month"]:
+            cur["department"] = row.department or "UNKNOWN"
+            cur["client"] = row.client or "UNKNOWN"
+            cur["project"] = row.project
+            cur["client_partner"] = row.client_partner
+            cur["duration_month"] = row.duration_ym
+            cur["payroll_month"] = row.payroll_month
+
+    for cur in agg.values():
+        ym = cur["duration_month"]
+        cur["duration_month"] = f"{ym // 100:04d}-{ym % 100:02d}"
+        payroll = cur["payroll_month"]
+        cur["payroll_month"] = payroll.strftime("%Y-%m") if payroll else None
+
+    return agg, allowance_ids
+
+
+def _aggregate_unique_employees(
+    agg: Dict[str, Dict[str, Any]],
+    emp_shift_days: List[Tuple[str, str, float]],
+    rates: Dict[str, float]
+) -> List[Dict[str, Any]]:
+    """
+    One entry per emp_id. Descriptive fields come from _collect_latest_rows;
+    shift days/amounts come from the SQL-side per (emp_id, shift) sums, so
+    amounts are computed once per (emp_id, shift) instead of per mapping.
+    """
+    # Matched rows without any counted mapping keep their zero defaults
+    if not emp_shift_days:
+        return list(agg.values())
+
+    # Amounts, totals and rounding as column operations over (emp_id, shift) rows
+    sd = pd.DataFrame(emp_shift_days, columns=["emp_id", "shift_key", "days"]).astype({"days": "float64"})
+    sd["amount"] = sd["days"] * sd["shift_key"].map(rates).fillna(0.0)
+    totals = sd.groupby("emp_id", sort=False)["amount"].sum().round(2)
+    sd["days"] = sd["days"].round(2)
+    sd["amount"] = sd["amount"].round(2)
+
+    for emp_id, grp in sd.groupby("emp_id", sort=False):
+        cur = agg.get(emp_id)
+        if cur is None:
+            continue
+        cur["shift_days"] = dict(zip(grp["shift_key"], grp["days"]))
+        cur["shift_details"] = dict(zip(grp["shift_key"], grp["amount"]))
+        cur["total_allowance"] = float(totals[emp_id])
+
+    return list(agg.values())
 
 
 def aggregate_shift_details(
-    db: Session,
-    rows,
+    emp_shift_days: List[Tuple[str, str, float]],
     rates: Dict[str, float],
-    selected_shifts: Optional[Set[str]]
+    emp_ids: Set[str]
 ):
     """
-    Overall shift totals across filtered rows. Applies selected_shifts if provided.
+    Overall shift totals for the given employees, summed from the per
+    (emp_id, shift) day totals already fetched (selected shifts applied).
     """
-    overall = {k: 0.0 for k in get_all_shift_keys()}
-    total = 0.0
-    for row in rows:
-        mappings = db.query(ShiftMapping).filter(ShiftMapping.shiftallowance_id == row.id).all()
-        for m in mappings:
-            days = float(m.days or 0)
-            if days <= 0:
-                continue
-            shift_key = (m.shift_type or "").upper().strip()
-
-            if selected_shifts is not None and shift_key not in selected_shifts:
-                continue
-
-            rate = float(rates.get(shift_key, 0.0))
-            amount = days * rate
-            if shift_key in overall:
-                overall[shift_key] += amount
-            else:
-                overall[shift_key] = overall.get(shift_key, 0.0) + amount
-            total += amount
-    return overall, total
+    overall = {k: 0.0 for k in _ALL_SHIFT_KEYS}
+    sd = pd.DataFrame(emp_shift_days, columns=["emp_id", "shift_key", "days"])
+    sd = sd[sd["emp_id"].isin(emp_ids)]
+    amounts = (sd["days"] * sd["shift_key"].map(rates).fillna(0.0)).groupby(sd["shift_key"]).sum()
+    overall.update(amounts.to_dict())
+    return overall, float(amounts.sum())
+
+
+@lru_cache(maxsize=64)
+def _parse_shift_label(k: str) -> Tuple[str, str]:
+    """(label, timing) parsed from get_shift_string(k); the shift config is static."""
+    s = (get_shift_string(k) or "").strip()
+    lines = s.splitlines()
+    label = (lines[0].strip() if lines else "") or k
+    timing = lines[1].strip() if len(lines) >= 2 else ""
+    if timing.startswith("(") and timing.endswith(")"):
+        timing = timing[1:-1].strip()
+    return label, timing
 
 
 def _build_shift_meta(keys: List[str], rates: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
@@ -396,18 +419,8 @@ def _build_shift_meta(keys: List[str], rates: Dict[str, float]) -> Dict[str, Dic
     """
     meta: Dict[str, Dict[str, Any]] = {}
     for k in keys:
-        s = (get_shift_string(k) or "").strip()
-        label, timing = k, ""
-        if s:
-            lines = s.splitlines()
-            if len(lines) >= 1:
-                label = lines[0].strip() or k
-            if len(lines) >= 2:
-                timing = lines[1].strip()
-                if timing.startswith("(") and timing.endswith(")"):
-                    timing = timing[1:-1].strip()
-        amount = float(rates.get(k, 0.0))
-        meta[k] = {"label": label, "timing": timing, "amount": amount}
+        label, timing = _parse_shift_label(k)
+        meta[k] = {"label": label, "timing": timing, "amount": float(rates.get(k, 0.0))}
     return meta
 
 def export_filtered_excel(
@@ -472,109 +485,74 @@ def export_filtered_excel(
         return False
 
     
-    shift_values = _normalize_to_list(shifts)
+    # Common case first: no shift restriction skips parsing and validation
+    if not shifts or (isinstance(shifts, str) and shifts.strip().upper() == "ALL"):
+        shift_values = None
+    else:
+        shift_values = _normalize_to_list(shifts)
+
+    shift_values_up: List[str] = []
+    selected_shifts: Optional[Set[str]] = None
     if shift_values:
-        allowed = {s.upper().strip() for s in get_all_shift_keys()}
-        invalid = [s.upper().strip() for s in shift_values if s.upper().strip() not in allowed]
+        shift_values_up = [s.upper() for s in shift_values]
+        invalid = [s for s in shift_values_up if s not in _ALLOWED_SHIFTS]
         if invalid:
             raise HTTPException(
                 400,
-                f"Invalid shift type(s): {', '.join(invalid)}. Allowed: {', '.join(sorted(allowed))}.",
+                f"Invalid shift type(s): {', '.join(invalid)}. Allowed: {', '.join(sorted(_ALLOWED_SHIFTS))}.",
             )
-    shift_values_up = [s.upper().strip() for s in (shift_values or [])]
-    selected_shifts: Optional[Set[str]] = set(shift_values_up) if shift_values_up else None
+        selected_shifts = set(shift_values_up)
 
    
     def _apply_filters_no_period(q):
         # emp_id filter
         emp_ids = _normalize_to_list(emp_id)
         if emp_ids:
-            like_terms = [func.upper(ShiftAllowances.emp_id).like(f"%{e.upper()}%") for e in emp_ids]
-            q = q.filter(or_(*like_terms))
+            q = q.filter(_like_any(ShiftAllowances.emp_id, emp_ids))
 
         # client_partner filter
         partner_vals = _normalize_to_list(client_partner)
         if partner_vals:
-            like_terms = [func.upper(ShiftAllowances.client_partner).like(f"%{p.upper()}%") for p in partner_vals]
-            q = q.filter(or_(*like_terms))
+            q = q.filter(_like_any(ShiftAllowances.client_partner, partner_vals))
 
         # Clients & Departments
         q = apply_client_department_filters(q, clients=clients, departments=departments)
 
         
         if shift_values:
-            q = q.filter(
-                exists().where(
-                    and_(
-                        ShiftMapping.shiftallowance_id == ShiftAllowances.id,
-                        func.upper(func.trim(ShiftMapping.shift_type)).in_(shift_values_up),
-                        or_(ShiftMapping.days.is_(None), ShiftMapping.days > 0),
-                    )
+            # JOIN to the distinct matching allowance ids (hash-joinable) rather than
+            # a correlated EXISTS evaluated per outer row
+            sm_subq = (
+                select(ShiftMapping.shiftallowance_id)
+                .where(
+                    func.upper(func.trim(ShiftMapping.shift_type)).in_(shift_values_up),
+                    or_(ShiftMapping.days.is_(None), ShiftMapping.days > 0),
                 )
+                .distinct()
+                .subquery()
             )
+            q = q.join(sm_subq, sm_subq.c.shiftallowance_id == ShiftAllowances.id)
         return q
 
-    def _base_query_for_month(y: int, m: int):
-        return (
-            db.query(
-                ShiftAllowances.id,
-                ShiftAllowances.emp_id,
-                ShiftAllowances.emp_name,
-                ShiftAllowances.department,
-                ShiftAllowances.client,
-                ShiftAllowances.project,
-                ShiftAllowances.client_partner,
-                func.to_char(ShiftAllowances.duration_month, "YYYY-MM").label("duration_month"),
-                func.to_char(ShiftAllowances.payroll_month, "YYYY-MM").label("payroll_month"),
-            )
-            .filter(
-                and_(
-                    extract("year", ShiftAllowances.duration_month) == y,
-                    extract("month", ShiftAllowances.duration_month) == m,
-                )
-            )
-        )
-
-    def _any_row_for(y: int, m: int) -> bool:
-        q = _apply_filters_no_period(_base_query_for_month(y, m))
-        exists_row = q.first()
-        return bool(exists_row)
-
     messages: List[str] = []
 
    
     if not years and not months:
+        # Current month plus a 12-month fallback window, resolved in one query
         today = date.today()
         current_ym = f"{today.year:04d}-{today.month:02d}"
+        latest = _latest_ym_in(_apply_filters_no_period(db.query(ShiftAllowances)), _recent_yms(today, 13))
 
-        if _any_row_for(today.year, today.month):
-            periods = [(today.year, today.month)]
-            meta = {"current_month_attempted": current_ym}
-        else:
-            found: Optional[Tuple[int, int]] = None
-            attempt_ym = current_ym
-            for i in range(1, 13):
-                y = today.year
-                m = today.month - i
-                if m <= 0:
-                    m += 12
-                    y -= 1
-                if _any_row_for(y, m):
-                    found = (y, m)
-                    break
-
-            if not found:
-                raise HTTPException(
-                    404,
-                    "No data found for selected period/filters in the last 12 months."
-                )
+        if latest is None:
+            raise HTTPException(
+                404,
+                "No data found for selected period/filters in the last 12 months."
+            )
 
-            fb_ym = f"{found[0]:04d}-{found[1]:02d}"
-            periods = [found]
-            meta = {
-                "current_month_attempted": attempt_ym,
-                "current_month_fallback_used": fb_ym,
-            }
+        periods = [(latest // 100, latest % 100)]
+        meta = {"current_month_attempted": current_ym}
+        if latest != today.year * 100 + today.month:
+            meta["current_month_fallback_used"] = f"{latest // 100:04d}-{latest % 100:02d}"
     else:
         periods, meta = _resolve_periods_with_meta(db, years, months)
 
@@ -598,42 +576,34 @@ def export_filtered_excel(
             ShiftAllowances.client,
             ShiftAllowances.project,
             ShiftAllowances.client_partner,
-            func.to_char(ShiftAllowances.duration_month, "YYYY-MM").label("duration_month"),
-            func.to_char(ShiftAllowances.payroll_month, "YYYY-MM").label("payroll_month"),
+            _DURATION_YM.label("duration_ym"),
+            ShiftAllowances.payroll_month,
         )
 
-        period_clauses = [
-            and_(
-                extract("year", ShiftAllowances.duration_month) == y,
-                extract("month", ShiftAllowances.duration_month) == m,
-            )
-            for (y, m) in periods
-        ]
-
-        q = q.filter(or_(*period_clauses))
+        q = q.filter(_DURATION_YM.in_([y * 100 + m for (y, m) in periods]))
         q = _apply_filters_no_period(q)
 
         q = q.order_by(
-            extract("year", ShiftAllowances.duration_month).asc(),
-            extract("month", ShiftAllowances.duration_month).asc(),
+            _DURATION_YM.asc(),
             ShiftAllowances.emp_id.asc(),
         )
         return q
 
-    all_rows = _build_periods_query().all()
+    # Stream rows through a server-side cursor; only the per-employee entries
+    # and the id list are kept, never the full row set
+    rows_iter = _build_periods_query().execution_options(stream_results=True).yield_per(1000)
+    latest_by_emp, allowance_ids = _collect_latest_rows(rows_iter)
 
-    if not all_rows:
+    if not allowance_ids:
         extra = (" " + " ".join(messages)) if messages else ""
         raise HTTPException(404, f"No data found for selected period/filters.{extra}")
 
   
-    rates = {
-        (r.shift_type or "").upper().strip(): float(r.amount or 0)
-        for r in db.query(ShiftsAmount).all()
-    }
+    rates = load_shift_rates(db)
 
    
-    unique_employees = _aggregate_unique_employees(db, all_rows, rates, selected_shifts)
+    emp_shift_days = _fetch_emp_shift_days(db, allowance_ids, selected_shifts)
+    unique_employees = _aggregate_unique_employees(latest_by_emp, emp_shift_days, rates)
 
     
     headcount_ranges = _parse_headcount_ranges(headcounts)
@@ -665,10 +635,9 @@ def export_filtered_excel(
             raise HTTPException(404, f"No employees match the requested allowance range(s).{extra}")
 
     filtered_emp_ids = {emp["emp_id"] for emp in filtered_employees}
-    filtered_rows = [r for r in all_rows if r.emp_id in filtered_emp_ids]
 
     # Overall shift totals/summary (honors selected shifts AND allowance filter)
-    overall_shift, overall_total = aggregate_shift_details(db, filtered_rows, rates, selected_shifts)
+    overall_shift, overall_total = aggregate_shift_details(emp_shift_days, rates, filtered_emp_ids)
     headcount_value = len(filtered_employees)
 
     
@@ -693,15 +662,13 @@ def export_filtered_excel(
             reverse=reverse,
         )
     elif sort_by_key == "headcount":
-        counts = Counter()
         key_field = "department" if dept_vals else "client"
-        for emp in filtered_employees:
-            counts[emp.get(key_field) or "UNKNOWN"] += 1
-
-        filtered_employees.sort(
-            key=lambda e: (counts.get(e.get(key_field) or "UNKNOWN", 0), e.get("emp_id", "")),
-            reverse=reverse,
-        )
+        # resolve each employee's group once; it feeds both the counts and the sort key
+        groups = [emp.get(key_field) or "UNKNOWN" for emp in filtered_employees]
+        counts = Counter(groups)
+        keyed = [((counts[g], emp.get("emp_id", "")), emp) for g, emp in zip(groups, filtered_employees)]
+        keyed.sort(key=itemgetter(0), reverse=reverse)
+        filtered_employees = [emp for _, emp in keyed]
     elif sort_by_key in {"client", "client_partner"}:
         filtered_employees.sort(
             key=lambda e: (str(e.get(sort_by_key) or "").upper(), e.get("emp_id", "")),
@@ -717,7 +684,7 @@ def export_filtered_excel(
     employees_page = filtered_employees[start:start + limit]
 
    
-    all_keys = [k.upper().strip() for k in get_all_shift_keys()]
+    all_keys = list(_ALL_SHIFT_KEYS)
     formatted_shift_summary = {
         k: round(float(overall_shift.get(k, 0.0)), 2)
         for k in all_keys
@@ -0,0 +1,37 @@
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.models import ShiftsAmount
+
+
+# (ShiftsAmount version, rates) — replaced as one tuple so readers never see a torn pair
+_RATES_CACHE: Tuple[Optional[tuple], Dict[str, float]] = (None, {})
+
+
+def shift_rates_version(db: Session) -> tuple:
+    """Cheap change stamp for the ShiftsAmount table (max updated_at + row count)."""
+    return tuple(db.query(func.max(ShiftsAmount.updated_at), func.count(ShiftsAmount.id)).one())
+
+
+def load_shift_rates(db: Session, version: Optional[tuple] = None) -> Dict[str, float]:
+    """
+    Shift type -> rate, e.g. {'PST_MST': 700.0, 'ANZ': 900.0, ...}.
+    Keys are upper-cased and stripped, the latest row wins, and the dict is
+    reloaded only when the ShiftsAmount version changes. Treat it as read-only.
+    """
+    global _RATES_CACHE
+    if version is None:
+        version = shift_rates_version(db)
+    cached_version, rates = _RATES_CACHE
+    if cached_version == version:
+        return rates
+
+    rates = {
+        stype.upper().strip(): float(amount or 0)
+        for stype, amount in db.query(ShiftsAmount.shift_type, ShiftsAmount.amount).order_by(ShiftsAmount.id).all()
+        if stype and stype.strip()
+    }
+    _RATES_CACHE = (version, rates)
+    return rates
@@ -11,12 +11,19 @@ account manager is supported, with strict validation rules.
 """
 
 import re
-from datetime import datetime
-from decimal import Decimal
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import extract
+from sqlalchemy import Float, cast, distinct, exists, func, select
 from fastapi import HTTPException
-from models.models import ShiftAllowances, ShiftsAmount
+from models.models import ShiftAllowances, ShiftMapping, ShiftsAmount
+
+# The model has no account_manager column; the client partner is the account
+# manager (display_service falls back the same way)
+ACCOUNT_MANAGER_COL = ShiftAllowances.client_partner
+
+# Shift type as the baseline per-mapping loop compared it (strip + upper)
+_SHIFT_KEY = func.upper(func.trim(ShiftMapping.shift_type))
 
 def get_client_shift_summary(db: Session,
                              duration_month: str | None = None,
@@ -53,8 +60,8 @@ def get_client_shift_summary(db: Session,
         if not all(x.isalpha() or x.isspace() for x in account_manager):
             raise HTTPException(status_code=400,
                                 detail="Account manager must contain only letters and spaces")
-        manager_exists = db.query(ShiftAllowances).filter(
-            ShiftAllowances.account_manager == account_manager).first()
+        manager_exists = db.query(
+            exists().where(ACCOUNT_MANAGER_COL == account_manager)).scalar()
         if not manager_exists:
             raise HTTPException(status_code=404,
                                 detail=f"Account manager '{account_manager}' not found")
@@ -71,28 +78,27 @@ def get_client_shift_summary(db: Session,
     else:
         # No duration_month → pick current month or previous in DB
         current_month = datetime.today().replace(day=1).date()
-        query = db.query(ShiftAllowances.duration_month)
+        query = db.query(func.max(ShiftAllowances.duration_month))
         if account_manager:
-            query = query.filter(ShiftAllowances.account_manager == account_manager)
-        nearest = query.filter(ShiftAllowances.duration_month <= current_month)\
-                       .order_by(ShiftAllowances.duration_month.desc()).first()
-        if nearest and nearest[0]:
-            year, month = nearest[0].year, nearest[0].month
-            month_str = nearest[0].strftime("%Y-%m")
+            query = query.filter(ACCOUNT_MANAGER_COL == account_manager)
+        nearest = query.filter(ShiftAllowances.duration_month <= current_month).scalar()
+        if nearest:
+            year, month = nearest.year, nearest.month
+            month_str = nearest.strftime("%Y-%m")
         else:
             raise HTTPException(status_code=404,
                                 detail="No records found for current or previous months")
 
-    # Fetch records
-    query = db.query(ShiftAllowances).filter(
-        extract("year", ShiftAllowances.duration_month) == year,
-        extract("month", ShiftAllowances.duration_month) == month
-    )
-    if account_manager:
-        query = query.filter(ShiftAllowances.account_manager == account_manager)
+    try:
+        month_start = date(year, month, 1)
+    except ValueError:
+        raise HTTPException(status_code=400,
+                            detail="Invalid duration_month format. Use YYYY-MM")
 
-    records = query.all()
-    if not records:
+    # Aggregate the month in SQL
+    summaries = get_client_shift_summary_range(db, month_start, month_start, account_manager)
+    result = summaries.get(month_start.strftime("%Y-%m"))
+    if not result:
         raise HTTPException(
     status_code=404,
     detail=(
@@ -100,61 +106,92 @@ def get_client_shift_summary(db: Session,
         f"{f' for manager {account_manager}' if account_manager else ''}"
     )
 )
-    # Get shift rates
-    rates = {r.shift_type.upper(): float(r.amount) for r in db.query(ShiftsAmount).all()}
-
-    # Group data
-    summary = {}
-    for row in records:
-        am = row.account_manager or "Unknown"
-        client = row.client or "Unknown"
-
-        if am not in summary:
-            summary[am] = {}
-        if client not in summary[am]:
-            summary[am][client] = {
-                "employees": set(),
-                "shift_a": Decimal(0),
-                "shift_b": Decimal(0),
-                "shift_c": Decimal(0),
-                "prime": Decimal(0),
-                "total_allowances": Decimal(0)
-            }
-
-        summary[am][client]["employees"].add(row.emp_id)
-
-        for mapping in row.shift_mappings:
-            stype = mapping.shift_type.strip().upper()
-            days = Decimal(mapping.days or 0)
-
-            if stype == "A":
-                summary[am][client]["shift_a"] += days
-            elif stype == "B":
-                summary[am][client]["shift_b"] += days
-            elif stype == "C":
-                summary[am][client]["shift_c"] += days
-            elif stype == "PRIME":
-                summary[am][client]["prime"] += days
-
-            rate = Decimal(str(rates.get(stype, 0)))
-            summary[am][client]["total_allowances"] += days * rate
-
-    #  Build response -
-    result = []
-    for am, clients in summary.items():
-        for client, info in clients.items():
-            total_days = float(info["shift_a"] + info["shift_b"] + info["shift_c"] + info["prime"])
-            result.append({
-                "account_manager": am,
-                "client": client,
-                "total_employees": len(info["employees"]),
-                "shift_a_days": float(info["shift_a"]),
-                "shift_b_days": float(info["shift_b"]),
-                "shift_c_days": float(info["shift_c"]),
-                "prime_days": float(info["prime"]),
-                "total_days": total_days,
-                "total_allowances": float(info["total_allowances"]),
-                "duration_month": month_str
-            })
+    for entry in result:
+        entry["duration_month"] = month_str
 
     return {month_str: result}
+
+
+def _shift_days(shift_type: str):
+    """sum(days) over the group's mappings of one shift type (0 when none)."""
+    return cast(func.coalesce(
+        func.sum(ShiftMapping.days).filter(_SHIFT_KEY == shift_type), 0
+    ), Float)
+
+
+def get_client_shift_summary_range(db: Session,
+                                   start: date,
+                                   end: date,
+                                   account_manager: str | None = None) -> dict:
+    """
+    Generate client-wise shift summaries for every month in [start, end].
+
+    Everything is aggregated by Postgres in ONE query grouped by month,
+    account manager and client: distinct employees, day totals per shift
+    type and days * rate (latest ShiftsAmount row per shift type, 0 when
+    unrated). Sums run on NUMERIC and are cast to float8 once in SQL, so no
+    Decimal objects reach Python. No input validation is done here.
+
+    Args:
+        db (Session): Active SQLAlchemy database session.
+        start (date): First month of the range (day 1).
+        end (date): Last month of the range (day 1), inclusive.
+        account_manager (str | None): Optional account manager filter.
+
+    Returns:
+        dict: A mapping of YYYY-MM to a list of client shift summaries.
+            Months without records are omitted.
+    """
+    month_col = func.date_trunc("month", ShiftAllowances.duration_month)
+    am_col = func.coalesce(func.nullif(ACCOUNT_MANAGER_COL, ""), "Unknown")
+    client_col = func.coalesce(func.nullif(ShiftAllowances.client, ""), "Unknown")
+    rate_sq = (
+        select(ShiftsAmount.amount)
+        .where(func.upper(func.trim(ShiftsAmount.shift_type)) == _SHIFT_KEY)
+        .order_by(ShiftsAmount.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    stmt = (
+        select(
+            month_col.label("month"),
+            am_col.label("account_manager"),
+            client_col.label("client"),
+            func.count(distinct(ShiftAllowances.emp_id)).label("total_employees"),
+            _shift_days("A").label("shift_a"),
+            _shift_days("B").label("shift_b"),
+            _shift_days("C").label("shift_c"),
+            _shift_days("PRIME").label("prime"),
+            cast(func.coalesce(
+                func.sum(ShiftMapping.days * func.coalesce(rate_sq, 0)), 0
+            ), Float).label("total_allowances"),
+        )
+        .outerjoin(ShiftMapping, ShiftMapping.shiftallowance_id == ShiftAllowances.id)
+        .where(
+            ShiftAllowances.duration_month >= start,
+            ShiftAllowances.duration_month < end + relativedelta(months=1)
+        )
+        .group_by(month_col, am_col, client_col)
+        .order_by(month_col)
+    )
+    if account_manager:
+        stmt = stmt.where(ACCOUNT_MANAGER_COL == account_manager)
+
+    summaries = {}
+    for row in db.execute(stmt):
+        month_str = row.month.strftime("%Y-%m")
+        summaries.setdefault(month_str, []).append({
+            "account_manager": row.account_manager,
+            "client": row.client,
+            "total_employees": row.total_employees,
+            "shift_a_days": row.shift_a,
+            "shift_b_days": row.shift_b,
+            "shift_c_days": row.shift_c,
+            "prime_days": row.prime,
+            "total_days": row.shift_a + row.shift_b + row.shift_c + row.prime,
+            "total_allowances": row.total_allowances,
+            "duration_month": month_str
+        })
+
+    return summaries
@@ -2,24 +2,41 @@
 
 import os
 import uuid
-import io
+import math
 import re
+from collections import defaultdict
 from datetime import datetime, date
 from decimal import Decimal
+from functools import lru_cache
+import numpy as np
+import openpyxl
+import xlsxwriter
 import pandas as pd
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, tuple_
 from sqlalchemy.orm import Session
 import calendar
 from schemas.displayschema import CorrectedRow
-from models.models import UploadedFiles, ShiftAllowances, ShiftMapping, ShiftsAmount
+from models.models import UploadedFiles, ShiftAllowances, ShiftMapping
 from utils.enums import ExcelColumnMap
-from utils.shift_config import get_shift_string, get_all_shift_keys, get_allowance_columns
+from utils.shift_config import SHIFT_KEYS, SHIFT_KEYS_UPPER, get_shift_string, get_allowance_columns
 from fastapi.responses import JSONResponse
+from services.get_excel_service import invalidate_shift_excel_cache
+from services.shift_rates import load_shift_rates
 
 TEMP_FOLDER = "media/error_excels"
 os.makedirs(TEMP_FOLDER, exist_ok=True)
 
 
+# Shift config is static; build the column lists once (lists, for DataFrame indexing)
+_SHIFT_KEYS = list(SHIFT_KEYS)
+_DAY_COLS = _SHIFT_KEYS + ["total_days"]
+
+_MONTH_PATTERN = re.compile(r"^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'[0-9]{2}$")
+_SHORT_MONTH_RE = re.compile(r"^[A-Za-z]{3}'\d{2}$")
+_WS_RE = re.compile(r"\s+")
+
 MONTH_MAP = {
     "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4,
     "May": 5, "Jun": 6, "Jul": 7, "Aug": 8,
@@ -28,6 +45,9 @@ MONTH_MAP = {
 
 
 def format_inr(amount):
+    # Fast path for plain numbers; round() is half-even like the Decimal format below
+    if isinstance(amount, (int, float)) and math.isfinite(amount):
+        return f"₹ {int(round(amount)):,}"
     try:
         amount = Decimal(amount)
     except Exception:
@@ -43,42 +63,19 @@ def make_json_safe(obj):
         return [make_json_safe(i) for i in obj]
     return obj
 
-def parse_month_format(value: str):
-    """Parse Mon'YY format to date object."""
-    if not isinstance(value, str):
-        return None
-    try:
-        m, y = value.split("'")
-        return datetime(2000 + int(y), MONTH_MAP[m.title()], 1).date()
-    except Exception:
-        return None
-
-def load_shift_rates(db: Session) -> dict:
-    """Load shift allowance rates from DB."""
-    return {
-        r.shift_type.upper(): float(r.amount or 0)
-        for r in db.query(ShiftsAmount).all()
-        if r.shift_type
-    }
-
-def delete_existing_emp_month(db, emp_id, client, duration_month, payroll_month):
-    """Delete existing records for an employee and month before insert."""
-    records = (
-        db.query(ShiftAllowances)
-        .filter(
-            ShiftAllowances.emp_id == emp_id,
-            ShiftAllowances.client == client,
-            ShiftAllowances.duration_month == duration_month,
-            ShiftAllowances.payroll_month == payroll_month,
-        )
-        .all()
+def parse_month_column(values: pd.Series) -> pd.Series:
+    """Parse a column of Mon'YY strings to first-of-month dates (None where unparseable)."""
+    parts = values.astype(str).str.strip().str.extract(r"^([A-Za-z]{3})'(\d{2})$")
+    dates = pd.to_datetime(
+        {
+            "year": 2000 + pd.to_numeric(parts[1]),
+            "month": parts[0].str.title().map(MONTH_MAP),
+            "day": 1,
+        },
+        errors="coerce",
     )
+    return dates.dt.date.astype(object).where(dates.notna(), None)
 
-    for rec in records:
-        db.query(ShiftMapping).filter(ShiftMapping.shiftallowance_id == rec.id).delete()
-        db.delete(rec)
-
-    db.flush()
 
 def validate_required_excel_columns(df: pd.DataFrame):
     """Ensure all required columns exist in uploaded Excel."""
@@ -93,73 +90,84 @@ def validate_required_excel_columns(df: pd.DataFrame):
 
 def validate_excel_data(df: pd.DataFrame):
     """Validate Excel data: numeric shifts, month formats, total days."""
-    errors, error_rows = [], []
-    month_pattern = re.compile(r"^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'[0-9]{2}$")
-
-    shift_keys = get_all_shift_keys()
-
-    for idx, row in df.iterrows():
-        row_errors = []
-
-       
-        for col in shift_keys + ["total_days"]:
-            try:
-                df.at[idx, col] = float(row.get(col, 0) or 0)
-                if df.at[idx, col] < 0:
-                    row_errors.append(f"Negative value in '{col}'")
-            except Exception:
-                row_errors.append(f"Invalid numeric value in '{col}'")
-
-       
-        for col in ["duration_month", "payroll_month"]:
-            val = str(row.get(col, "")).strip()
-            if val and not month_pattern.match(val):
-                row_errors.append(f"Invalid duration_month format in '{col}'")
-                row_errors.append(f"Invalid payroll_month format in '{col}'")
-
-       
-        try:
-            total = sum(float(row.get(c, 0) or 0) for c in shift_keys)
-            if abs(total - float(row.get("total_days", 0) or 0)) > 0.01:
-                row_errors.append("Total days do not match sum of shifts")
-        except Exception:
-            pass
+    shift_keys = _SHIFT_KEYS
+    num_cols = _DAY_COLS
+
+    # Column-wise checks; each (mask, message) pair appends to the row's error text
+    raw = df.reindex(columns=num_cols, fill_value=0)
+    blank = raw.isna() | raw.eq("")
+    coerced = raw.apply(pd.to_numeric, errors="coerce").astype(float).mask(blank, 0.0)
+
+    checks = []
+    for col in num_cols:
+        checks.append((coerced[col].isna(), f"Invalid numeric value in '{col}'"))
+        checks.append((coerced[col].lt(0), f"Negative value in '{col}'"))
+
+    for col in ["duration_month", "payroll_month"]:
+        if col not in df.columns:
+            continue
+        vals = df[col].astype(str).str.strip()
+        bad = vals.ne("") & ~vals.str.match(_MONTH_PATTERN)
+        checks.append((bad, f"Invalid duration_month format in '{col}'"))
+        checks.append((bad, f"Invalid payroll_month format in '{col}'"))
+
+    # One NumPy pass over the (rows x shifts) matrix. NaN (a non-numeric cell) never
+    # compares > 0.01, so the sum check is skipped for that row
+    mat = coerced[shift_keys].to_numpy(np.float64)
+    totals = coerced["total_days"].to_numpy(np.float64)
+    with np.errstate(invalid="ignore"):
+        mismatch = np.abs(mat.sum(axis=1) - totals) > 0.01
+    checks.append((pd.Series(mismatch, index=df.index), "Total days do not match sum of shifts"))
+
+    reason = pd.Series("", index=df.index)
+    for mask, msg in checks:
+        reason[mask] += msg + "; "
+    err_mask = reason.ne("")
+
+    clean = df.loc[~err_mask].copy()
+    clean[num_cols] = coerced.loc[~err_mask]
+    clean = clean.reset_index(drop=True)
+
+    if not err_mask.any():
+        return clean, None
+    error_df = df.loc[err_mask].assign(error=reason[err_mask].str[:-2]).reset_index(drop=True)
+    return clean, error_df
+
+def _parse_error_reason(err_text: str) -> dict:
+    """Map a validation error string to {field: reason}."""
+    reason = {}
+    for err in err_text.split(";"):
+        err = err.strip()
+        if "numeric" in err or "Negative" in err:
+            parts = err.split("'")
+            if len(parts) >= 2:
+                reason[parts[1]] = "Expected non-negative numeric value"
+            else:
+                reason["numeric"] = "Expected non-negative numeric value"
+        elif "month format" in err:
+            reason["duration_month"] = "Expected Mon'YY format"
+        elif "month_format" in err:
+            reason["payroll_month"] = "Expected Mon'YY format"
+        elif "Total days" in err:
+            reason["total_days"] = "Shift days mismatch"
+    return reason
 
-        if row_errors:
-            r = row.to_dict()
-            r["error"] = "; ".join(row_errors)
-            error_rows.append(r)
-            errors.append(idx)
-
-    return df.drop(index=errors).reset_index(drop=True), (
-        pd.DataFrame(error_rows) if error_rows else None
-    )
 
 def normalize_error_rows(error_rows):
     """Normalize errors for JSON response."""
+    # Many rows share the same error text; parse each distinct text once
+    parsed = {}
     normalized = []
     for row in error_rows:
         r = dict(row)
         err_text = r.pop("error", "")
-        reason = {}
-        for err in err_text.split(";"):
-            err = err.strip()
-            if "numeric" in err or "Negative" in err:
-                parts = err.split("'")
-                if len(parts) >= 2:
-                    reason[parts[1]] = "Expected non-negative numeric value"
-                else:
-                    reason["numeric"] = "Expected non-negative numeric value"
-            elif "month format" in err:
-                reason["duration_month"] = "Expected Mon'YY format"
-            elif "month_format" in err:
-                reason["payroll_month"] = "Expected Mon'YY format"
-            elif "Total days" in err:
-                reason["total_days"] = "Shift days mismatch"
-        r["reason"] = reason
+        if err_text not in parsed:
+            parsed[err_text] = _parse_error_reason(err_text)
+        r["reason"] = dict(parsed[err_text])
         normalized.append(r)
     return normalized
 
+@lru_cache(maxsize=2048)
 def normalize_header(s: str) -> str:
     """
     Normalize Excel headers for robust matching:
@@ -172,12 +180,141 @@ def normalize_header(s: str) -> str:
         return ""
     s = str(s).strip()
     s = s.replace("–", "-").replace("—", "-").replace("−", "-")
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     return s.lower()
 
 
+# Mapped descriptive columns; blank cells in these are read as empty strings
+_TEXT_COLUMNS = frozenset(
+    e.name for e in ExcelColumnMap
+    if e.name not in {*SHIFT_KEYS, "total_days", "duration_month", "payroll_month"}
+)
+
+# Allowance headers are static config; normalize them once at import
+_NORMALIZED_ALLOWANCE_COLS = frozenset(normalize_header(c) for c in get_allowance_columns())
+
+
+def read_excel_upload(fileobj) -> pd.DataFrame:
+    """
+    Read the first worksheet of an .xlsx upload into a DataFrame.
+
+    Uses openpyxl's read-only streaming reader on the spooled upload file, so
+    the workbook is never built as a full cell tree or copied into a bytes buffer.
+    Matches pd.read_excel: stale sheet dimensions are ignored, ragged rows are
+    padded to the widest row, trailing blank rows are dropped, and blank or
+    duplicate headers become "Unnamed: i" / "X.1", "X.2", ...
+    """
+    wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = [_trim_trailing_none(r) for r in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+    if not rows:
+        return pd.DataFrame()
+    while len(rows) > 1 and not rows[-1]:
+        rows.pop()
+
+    width = max(len(r) for r in rows)
+    header = rows[0] + (None,) * (width - len(rows[0]))
+    data = [r + (None,) * (width - len(r)) for r in rows[1:]]
+
+    columns = _dedup_names([h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)])
+    return pd.DataFrame.from_records(data, columns=columns)
+
+
+def _trim_trailing_none(row: tuple) -> tuple:
+    end = len(row)
+    while end and row[end - 1] is None:
+        end -= 1
+    return row[:end]
+
+
+def _dedup_names(names: list) -> list:
+    """Rename repeated column names to X, X.1, X.2, ... exactly as pandas does."""
+    counts = defaultdict(int)
+    for i, col in enumerate(names):
+        cur = counts[col]
+        while cur > 0:
+            counts[col] = cur + 1
+            col = f"{col}.{cur}"
+            cur = counts[col]
+        names[i] = col
+        counts[col] = cur + 1
+    return names
+
+
+def write_error_report(error_df: pd.DataFrame, file_path: str) -> None:
+    """
+    Write validation error rows to an .xlsx report.
+
+    constant_memory streams each row to disk once the next starts, so memory
+    stays bounded however many rows failed; cells are written in row order
+    with per-column formats resolved once up front.
+    """
+    shift_keys = _SHIFT_KEYS
+    day_cols = frozenset(_DAY_COLS)
+
+    wb = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+    try:
+        sheet = wb.add_worksheet("Errors")
+
+        fmt_header = wb.add_format({
+            "align": "center", "valign": "vcenter",
+            "bold": True, "border": 1, "text_wrap": True
+        })
+        fmt_center = wb.add_format({
+            "align": "center", "valign": "vcenter", "border": 1
+        })
+        fmt_days = wb.add_format({
+            "align": "center", "valign": "vcenter", "border": 1,
+            "num_format": "0.0"
+        })
+        fmt_inr = wb.add_format({
+            "align": "center", "valign": "vcenter", "border": 1,
+            "num_format": "₹ #,##0"
+        })
+
+        # numeric format per column (None = plain text cell)
+        col_formats = []
+        for c, col in enumerate(error_df.columns):
+            header = (get_shift_string(col) if col in shift_keys else col) or col
+            sheet.write(0, c, header, fmt_header)
+            sheet.set_column(c, c, 25)
+            if col in day_cols:
+                col_formats.append(fmt_days)
+            elif normalize_header(col) in _NORMALIZED_ALLOWANCE_COLS:
+                col_formats.append(fmt_inr)
+            else:
+                col_formats.append(None)
+
+        for r, row in enumerate(error_df.itertuples(index=False, name=None), start=1):
+            for c, (val, num_fmt) in enumerate(zip(row, col_formats)):
+                if num_fmt is not None:
+                    try:
+                        sheet.write_number(r, c, float(val or 0), num_fmt)
+                        continue
+                    except Exception:
+                        pass
+                sheet.write(r, c, "" if val is None else str(val), fmt_center)
+    finally:
+        wb.close()
+
+
 async def process_excel_upload(file, db: Session, user, base_url: str):
-    """Process uploaded Excel for shift allowances."""
+    """
+    Process uploaded Excel for shift allowances.
+
+    Parsing, validation and the DB writes are blocking, so they run in the
+    threadpool; the event loop keeps serving other requests meanwhile.
+    """
+    return await run_in_threadpool(_process_excel_upload, file, db, user)
+
+
+def _process_excel_upload(file, db: Session, user):
+    """Blocking body of process_excel_upload."""
     if not file.filename.endswith((".xls", ".xlsx")):
         raise HTTPException(400, "Only Excel files allowed")
 
@@ -191,11 +328,16 @@ async def process_excel_upload(file, db: Session, user, base_url: str):
     db.refresh(uploaded_file)
 
     try:
-        df = pd.read_excel(io.BytesIO(await file.read()))
+        if file.filename.endswith(".xlsx"):
+            df = read_excel_upload(file.file)
+        else:
+            df = pd.read_excel(file.file)
         validate_required_excel_columns(df)
 
         df.rename(columns={e.value: e.name for e in ExcelColumnMap}, inplace=True)
-        df = df.where(pd.notnull(df), 0)
+        # Blank text cells become "", everything else (day counts, months, extra
+        # numeric columns) 0 as before, so a blank month still fails validation
+        df = df.fillna({c: "" for c in _TEXT_COLUMNS if c in df.columns}).fillna(0)
 
         clean_df, error_df = validate_excel_data(df)
         error_rows, fname = [], None
@@ -206,72 +348,7 @@ async def process_excel_upload(file, db: Session, user, base_url: str):
             fname = f"validation_errors_{uuid.uuid4().hex}.xlsx"
             file_path = os.path.join(TEMP_FOLDER, fname)
 
-            with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
-                error_df.to_excel(writer, index=False, sheet_name="Errors")
-                workbook = writer.book
-                sheet = writer.sheets["Errors"]
-
-              
-                fmt_header = workbook.add_format({
-                    "align": "center", "valign": "vcenter",
-                    "bold": True, "border": 1, "text_wrap": True
-                })
-                fmt_center = workbook.add_format({
-                    "align": "center", "valign": "vcenter", "border": 1
-                })
-                fmt_days = workbook.add_format({
-                    "align": "center", "valign": "vcenter", "border": 1,
-                    "num_format": "0.0"   
-                })
-
-               
-                fmt_inr = workbook.add_format({
-                    "align": "center", "valign": "vcenter", "border": 1,
-                    "num_format": "₹ #,##0"
-                })
-
-                shift_keys = get_all_shift_keys()
-                DAY_COLS = set(shift_keys + ["total_days"])
-
-
-                configured_allowance_cols = get_allowance_columns()
-
-                normalized_allowance_cols = {normalize_header(c) for c in configured_allowance_cols}
-
-                CURRENCY_COLS = {
-                    col for col in error_df.columns
-                    if normalize_header(col) in normalized_allowance_cols
-                }
-                CURRENCY_COLS = CURRENCY_COLS - DAY_COLS
-
-                for c, col in enumerate(error_df.columns):
-
-                    header = get_shift_string(col) if col in shift_keys else col
-                    header = header or col
-                    sheet.write(0, c, header, fmt_header)
-                    sheet.set_column(c, c, 25)
-
-                for r, row in enumerate(error_df.itertuples(index=False), start=1):
-                    for c, val in enumerate(row):
-                        col_name = error_df.columns[c]
-
-                        if col_name in DAY_COLS:
-                           
-                            try:
-                                sheet.write_number(r, c, float(val or 0), fmt_days)
-                            except Exception:
-                                sheet.write(r, c, "" if val is None else str(val), fmt_center)
-
-                        elif col_name in CURRENCY_COLS:
-                           
-                            try:
-                                sheet.write_number(r, c, float(val or 0), fmt_inr)
-                            except Exception:
-                                sheet.write(r, c, "" if val is None else str(val), fmt_center)
-
-                        else:
-                        
-                            sheet.write(r, c, "" if val is None else str(val), fmt_center)
+            write_error_report(error_df, file_path)
 
        
         if clean_df.empty:
@@ -283,48 +360,71 @@ async def process_excel_upload(file, db: Session, user, base_url: str):
                 "error_rows": error_rows,
             }))
 
-        clean_df["duration_month"] = clean_df["duration_month"].apply(parse_month_format)
-        clean_df["payroll_month"] = clean_df["payroll_month"].apply(parse_month_format)
+        clean_df["duration_month"] = parse_month_column(clean_df["duration_month"])
+        clean_df["payroll_month"] = parse_month_column(clean_df["payroll_month"])
 
         shift_rates = load_shift_rates(db)
-        inserted = 0
 
-        allowed_fields = {
+        allowed_fields = [
             "emp_id", "emp_name", "grade", "department",
             "client", "project", "project_code",
             "client_partner", "practice_lead", "delivery_manager",
             "duration_month", "payroll_month",
             "billability_status", "practice_remarks", "rmg_comments",
-        }
-
-        shift_keys = get_all_shift_keys()
-        for row in clean_df.to_dict("records"):
-            delete_existing_emp_month(
-                db, row.get("emp_id"), row.get("client"),
-                row.get("duration_month"), row.get("payroll_month")
-            )
-
-            sa = ShiftAllowances(**{k: row[k] for k in allowed_fields if k in row})
-            db.add(sa)
-            db.flush()
-
-            for shift in shift_keys:
-                days = float(row.get(shift, 0) or 0)
-                if days > 0:
-                    db.add(ShiftMapping(
-                        shiftallowance_id=sa.id,
-                        shift_type=shift,
-                        days=days,
-                        total_allowance=days * shift_rates.get(shift, 0),
-                    ))
-
-            inserted += 1
-            uploaded_file.record_count = inserted
-            payroll_month_value = clean_df["payroll_month"].dropna().iloc[0] \
-                if not clean_df["payroll_month"].dropna().empty else None
-            uploaded_file.payroll_month = payroll_month_value
-            uploaded_file.status = "processed"
-            db.commit()
+        ]
+        key_fields = ["emp_id", "client", "duration_month", "payroll_month"]
+
+        # A repeated (employee, client, month) row replaces the earlier one, as before
+        upsert_df = clean_df.drop_duplicates(subset=key_fields, keep="last")
+        rows = upsert_df.to_dict("records")
+        inserted = len(clean_df)
+
+        # Replace existing records for these keys with one DELETE; their
+        # shift_mapping rows go with them via the FK's ON DELETE CASCADE
+        keys = list(upsert_df[key_fields].itertuples(index=False, name=None))
+        key_cols = tuple_(
+            ShiftAllowances.emp_id, ShiftAllowances.client,
+            ShiftAllowances.duration_month, ShiftAllowances.payroll_month,
+        )
+        db.execute(
+            delete(ShiftAllowances).where(key_cols.in_(keys)),
+            execution_options={"synchronize_session": False},
+        )
+
+        # One executemany insert; RETURNING ids come back in row order
+        sa_ids = db.scalars(
+            insert(ShiftAllowances).returning(ShiftAllowances.id, sort_by_parameter_order=True),
+            [{k: row[k] for k in allowed_fields if k in row} for row in rows],
+        ).all()
+
+        # (rows x shifts) day matrix times the rate vector; only positive cells become mappings
+        shift_keys = _SHIFT_KEYS
+        # Column-major: each shift's days are contiguous for the per-shift rate multiply.
+        # pandas stores a float block shift-major already, so this rarely copies.
+        days_arr = np.asfortranarray(upsert_df[shift_keys].to_numpy(np.float64))
+        rate_vec = np.array([shift_rates.get(k, 0.0) for k in shift_keys], dtype=np.float64)
+        alw_arr = days_arr * rate_vec
+        rows_i, cols_i = np.nonzero(days_arr > 0)
+        mappings = [
+            {
+                "shiftallowance_id": sa_ids[r],
+                "shift_type": shift_keys[c],
+                "days": float(days_arr[r, c]),
+                "total_allowance": float(alw_arr[r, c]),
+            }
+            for r, c in zip(rows_i.tolist(), cols_i.tolist())
+        ]
+        if mappings:
+            db.bulk_insert_mappings(ShiftMapping, mappings)
+
+        payroll_months = clean_df["payroll_month"].dropna()
+        uploaded_file.record_count = inserted
+        uploaded_file.payroll_month = payroll_months.iloc[0] if not payroll_months.empty else None
+        uploaded_file.status = "processed"
+        db.commit()
+
+        if inserted:
+            invalidate_shift_excel_cache()
 
         if error_rows:
             raise HTTPException(400, make_json_safe({
@@ -352,7 +452,7 @@ def parse_yyyy_mm(value: str) -> date:
             detail="Month is required in Mon'YY format (e.g., Jan'25)"
         )
     value = value.strip()
-    if not re.match(r"^[A-Za-z]{3}'\d{2}$", value):
+    if not _SHORT_MONTH_RE.match(value):
         raise HTTPException(
             status_code=400,
             detail="Invalid month format. Expected Mon'YY (e.g., Jan'25)"
@@ -375,117 +475,139 @@ def validate_half_day(value: float, field_name: str):
 def days_in_month(month_date: date) -> int:
     return calendar.monthrange(month_date.year, month_date.month)[1]
 
-def load_shift_rates(db: Session) -> dict:
-    """Load shift allowance rates from DB."""
-    return {
-        r.shift_type.upper(): float(r.amount or 0)
-        for r in db.query(ShiftsAmount).all()
-        if r.shift_type
-    }
-
 def update_corrected_rows(db: Session, corrected_rows: list[CorrectedRow]):
     """Update corrected rows for shift allowances using dynamic shift config."""
     if not corrected_rows:
         raise HTTPException(400, "No corrected rows provided")
 
     
-    shift_keys = [k.upper().strip() for k in get_all_shift_keys()]
-    valid_shift_set = set(shift_keys)
+    shift_keys = SHIFT_KEYS_UPPER
+    valid_shift_set = frozenset(SHIFT_KEYS_UPPER)
 
     shift_rates = load_shift_rates(db)
     failed_rows = []
+    today_month = date.today().replace(day=1)
 
+    # Fetch every existing allowance for the submitted keys in one SELECT;
+    # rows whose months do not parse are reported by the loop below
+    keys = set()
     for row in corrected_rows:
+        client = getattr(row, "client", None)
+        if client is None:
+            continue
         try:
-            duration_month = parse_yyyy_mm(row.duration_month)
-            payroll_month = parse_yyyy_mm(row.payroll_month)
-            today_month = date.today().replace(day=1)
-
-            if duration_month > today_month:
-                raise HTTPException(400, "Duration month cannot be a future month")
-            if payroll_month > today_month:
-                raise HTTPException(400, "Payroll month cannot be a future month")
-            if duration_month == payroll_month:
-                raise HTTPException(400, "Duration month and payroll month cannot be the same")
-            if payroll_month < duration_month:
-                raise HTTPException(400, "Payroll month must be after duration month")
+            keys.add((row.emp_id, client, parse_yyyy_mm(row.duration_month), parse_yyyy_mm(row.payroll_month)))
+        except HTTPException:
+            pass
+
+    existing = {}
+    if keys:
+        key_cols = tuple_(
+            ShiftAllowances.emp_id, ShiftAllowances.client,
+            ShiftAllowances.duration_month, ShiftAllowances.payroll_month,
+        )
+        for sa in db.query(ShiftAllowances).filter(key_cols.in_(list(keys))):
+            existing[(sa.emp_id, sa.client, sa.duration_month, sa.payroll_month)] = sa
+
+    # One transaction for the batch; a SAVEPOINT per row keeps failures isolated
+    for row in corrected_rows:
+        try:
+            with db.begin_nested():
+                duration_month = parse_yyyy_mm(row.duration_month)
+                payroll_month = parse_yyyy_mm(row.payroll_month)
+
+                if duration_month > today_month:
+                    raise HTTPException(400, "Duration month cannot be a future month")
+                if payroll_month > today_month:
+                    raise HTTPException(400, "Payroll month cannot be a future month")
+                if duration_month == payroll_month:
+                    raise HTTPException(400, "Duration month and payroll month cannot be the same")
+                if payroll_month < duration_month:
+                    raise HTTPException(400, "Payroll month must be after duration month")
 
         
-            dynamic = row.shift_days or {}
-            shifts = {str(k).upper().strip(): float(v or 0) for k, v in dynamic.items()}
+                dynamic = row.shift_days or {}
+                shifts = {str(k).upper().strip(): float(v or 0) for k, v in dynamic.items()}
 
             
-            if not shifts:
-                shifts = {k: float(getattr(row, k, 0) or 0) for k in shift_keys}
+                if not shifts:
+                    shifts = {k: float(getattr(row, k, 0) or 0) for k in shift_keys}
 
            
-            unknown = [k for k in shifts.keys() if k not in valid_shift_set]
-            if unknown:
-                raise HTTPException(400, f"Invalid shift types: {unknown}")
-
-            shifts = {k: float(shifts.get(k, 0) or 0) for k in shift_keys}
-
-            total_shift_days = 0.0
-            for shift_name, value in shifts.items():
-                validate_half_day(value, shift_name)
-                total_shift_days += value
-
-            if total_shift_days <= 0:
-                raise HTTPException(400, "At least one shift day must be greater than 0")
-            if total_shift_days > days_in_month(duration_month):
-                raise HTTPException(400, "Total shift days exceed days in duration month")
-
-
-            sa = (
-                db.query(ShiftAllowances)
-                .filter(
-                    ShiftAllowances.emp_id == row.emp_id,
-                    ShiftAllowances.client == getattr(row, "client", None),
-                    ShiftAllowances.duration_month == duration_month,
-                    ShiftAllowances.payroll_month == payroll_month,
-                )
-                .first()
-            )
-
-            if not sa:
-                sa = ShiftAllowances(
-                    emp_id=row.emp_id,
-                    client=getattr(row, "client", None),
-                    duration_month=duration_month,
-                    payroll_month=payroll_month,
-                )
-                db.add(sa)
-                db.flush()
+                unknown = [k for k in shifts.keys() if k not in valid_shift_set]
+                if unknown:
+                    raise HTTPException(400, f"Invalid shift types: {unknown}")
+
+                shifts = {k: float(shifts.get(k, 0) or 0) for k in shift_keys}
+
+                total_shift_days = 0.0
+                for shift_name, value in shifts.items():
+                    validate_half_day(value, shift_name)
+                    total_shift_days += value
+
+                if total_shift_days <= 0:
+                    raise HTTPException(400, "At least one shift day must be greater than 0")
+                if total_shift_days > days_in_month(duration_month):
+                    raise HTTPException(400, "Total shift days exceed days in duration month")
+
+
+                client = getattr(row, "client", None)
+                key = (row.emp_id, client, duration_month, payroll_month)
+                sa = existing.get(key)
+                if sa is None and client is None:
+                    # NULL client cannot match the batched tuple IN; look it up directly
+                    sa = (
+                        db.query(ShiftAllowances)
+                        .filter(
+                            ShiftAllowances.emp_id == row.emp_id,
+                            ShiftAllowances.client.is_(None),
+                            ShiftAllowances.duration_month == duration_month,
+                            ShiftAllowances.payroll_month == payroll_month,
+                        )
+                        .first()
+                    )
 
-            for attr in [
-                "emp_name", "grade", "department", "project", "project_code",
-                "client_partner", "practice_lead", "delivery_manager",
-                "current_status", "total_days", "timesheet_billable_days",
-                "timesheet_non_billable_days", "diff", "final_total_days",
-                "billability_status", "practice_remarks", "rmg_comments",
-                "amar_approval"
-            ]:
-                if hasattr(row, attr):
-                    setattr(sa, attr, getattr(row, attr))
+                if not sa:
+                    sa = ShiftAllowances(
+                        emp_id=row.emp_id,
+                        client=client,
+                        duration_month=duration_month,
+                        payroll_month=payroll_month,
+                    )
+                    db.add(sa)
+                    db.flush()
+
+                for attr in [
+                    "emp_name", "grade", "department", "project", "project_code",
+                    "client_partner", "practice_lead", "delivery_manager",
+                    "current_status", "total_days", "timesheet_billable_days",
+                    "timesheet_non_billable_days", "diff", "final_total_days",
+                    "billability_status", "practice_remarks", "rmg_comments",
+                    "amar_approval"
+                ]:
+                    if hasattr(row, attr):
+                        setattr(sa, attr, getattr(row, attr))
 
           
-            db.query(ShiftMapping).filter(ShiftMapping.shiftallowance_id == sa.id).delete()
-
-            for shift_name, days in shifts.items():
-                if days > 0:
-                    db.add(
-                        ShiftMapping(
-                            shiftallowance_id=sa.id,
-                            shift_type=shift_name,
-                            days=days,
-                            total_allowance=days * shift_rates.get(shift_name, 0),
+                db.query(ShiftMapping).filter(ShiftMapping.shiftallowance_id == sa.id).delete()
+
+                for shift_name, days in shifts.items():
+                    if days > 0:
+                        db.add(
+                            ShiftMapping(
+                                shiftallowance_id=sa.id,
+                                shift_type=shift_name,
+                                days=days,
+                                total_allowance=days * shift_rates.get(shift_name, 0),
+                            )
                         )
-                    )
 
-            db.commit()
+                # flush inside the savepoint so constraint errors fail only this row
+                db.flush()
+
+            existing[key] = sa
 
         except Exception as e:
-            db.rollback()
             failed_rows.append({
                 "emp_id": row.emp_id,
                 "project": getattr(row, "project", ""),
@@ -494,6 +616,11 @@ def update_corrected_rows(db: Session, corrected_rows: list[CorrectedRow]):
                 "reason": e.detail if isinstance(e, HTTPException) else str(e),
             })
 
+    db.commit()
+
+    if len(failed_rows) < len(corrected_rows):
+        invalidate_shift_excel_cache()
+
     if failed_rows:
         return JSONResponse(
             status_code=400,
@@ -0,0 +1,32 @@
+from services.search_service import _aggregate_unique_employees
+
+
+def _entry(emp_id):
+    return {
+        "emp_id": emp_id,
+        "shift_days": {},
+        "shift_details": {},
+        "total_allowance": 0.0,
+    }
+
+
+def test_aggregate_without_counted_mappings_keeps_zero_totals():
+    agg = {"E1": _entry("E1"), "E2": _entry("E2")}
+
+    result = _aggregate_unique_employees(agg, [], {"ANZ": 900.0})
+
+    assert [r["emp_id"] for r in result] == ["E1", "E2"]
+    assert all(r["total_allowance"] == 0.0 and r["shift_days"] == {} for r in result)
+
+
+def test_aggregate_sums_amounts_per_employee():
+    agg = {"E1": _entry("E1"), "E2": _entry("E2")}
+    emp_shift_days = [("E1", "ANZ", 2.0), ("E1", "PST_MST", 1.5)]
+
+    result = _aggregate_unique_employees(agg, emp_shift_days, {"ANZ": 900.0, "PST_MST": 700.0})
+
+    e1, e2 = result
+    assert e1["shift_days"] == {"ANZ": 2.0, "PST_MST": 1.5}
+    assert e1["shift_details"] == {"ANZ": 1800.0, "PST_MST": 1050.0}
+    assert e1["total_allowance"] == 2850.0
+    assert e2["total_allowance"] == 0.0
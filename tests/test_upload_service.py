@@ -0,0 +1,11 @@
+from datetime import date
+
+import pandas as pd
+
+from services.upload_service import parse_month_column
+
+
+def test_parse_month_column_strips_whitespace():
+    parsed = parse_month_column(pd.Series(["Jan'25 ", " feb'24", "Mar'23", "bad", None]))
+
+    assert parsed.tolist() == [date(2025, 1, 1), date(2024, 2, 1), date(2023, 3, 1), None, None]
@@ -8,8 +8,10 @@ with appropriate HTTP error handling.
 """
 
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
@@ -64,10 +66,39 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 # TOKEN DECODING
+@lru_cache(maxsize=4096)
+def _decode_access_claims(token: str) -> Tuple[int, float]:
+    """
+    Verify an access token once and memoize its (user_id, exp).
+
+    Only successful decodes are cached (lru_cache does not store raised
+    exceptions); expiry is re-checked by the caller on every hit.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid token")
+
+    if payload.get("token_type") != "access":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid access token")
+
+    user_id: int = payload.get("user_id")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid token")
+
+    return user_id, float(payload.get("exp", float("inf")))
+
+
 def decode_access_token(token: str):
     """
     Decode and validate a JWT access token.
 
+    Signature verification is memoized per token; expiry is still enforced
+    on every call.
+
     Args:
         token (str): JWT access token.
 
@@ -75,23 +106,13 @@ def decode_access_token(token: str):
         dict: Decoded payload containing user_id.
 
     Raises:
-        HTTPException: If token is invalid or not an access token.
+        HTTPException: If token is invalid, expired or not an access token.
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("token_type") != "access":
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                detail="Invalid access token")
-
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                detail="Invalid token")
-
-        return {"user_id": user_id}
-    except JWTError:
+    user_id, exp = _decode_access_claims(token)
+    if time.time() >= exp:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid token")
+    return {"user_id": user_id}
 
 
 def decode_refresh_token(token: str):
@@ -7,19 +7,24 @@ SHIFT_TYPES = {
     "ANZ": "ANZ – Australia New Zealand\n(03 AM - 12 PM)\nINR 500",
 }
 
-ALLOWANCE_COLUMNS = {
+ALLOWANCE_COLUMNS = frozenset({
     "PST/ MST Allowances",
     "US/India Allowances",
     "SG – Singapore Allowances",
     "ANZ – Australia New Zealand Allowances",
     "TOTAL DAYS Allowances",
-}
+})
+
+# Derived once at import; the config above is static
+SHIFT_KEYS = tuple(SHIFT_TYPES.keys())
+SHIFT_KEYS_UPPER = tuple(k.upper().strip() for k in SHIFT_KEYS)
 
 def get_shift_string(shift_key: str) -> str:
     return SHIFT_TYPES.get(shift_key.upper())
 
 def get_all_shift_keys() -> list:
-    return list(SHIFT_TYPES.keys())
+    # callers concatenate and index DataFrames with this, so hand out a list copy
+    return list(SHIFT_KEYS)
 
-def get_allowance_columns() -> set:
-    return set(ALLOWANCE_COLUMNS)
\ No newline at end of file
+def get_allowance_columns() -> frozenset:
+    return ALLOWANCE_COLUMNS
\ No newline at end of file